@@ -215,9 +215,18 @@ TCP_KEEPALIVE = {
     'enabled': get_config_value('tcp', 'keepalive_enabled', True, bool),
     'idle': get_config_value('tcp', 'keepalive_idle', 60, int),      # Время простоя перед началом отправки keep-alive зондов
     'interval': get_config_value('tcp', 'keepalive_interval', 10, int),  # Интервал keep-alive зондов
-    'count': get_config_value('tcp', 'keepalive_count', 3, int)       # Максимальное количество keep-alive зондов
+    'count': get_config_value('tcp', 'keepalive_count', 3, int),      # Максимальное количество keep-alive зондов
+    'tune_per_socket': get_config_value('tcp', 'keepalive_tune_per_socket', True, bool)  # Задавать idle/interval/count на каждом сокете (иначе - параметры ядра)
 }
 SOCKET_TIMEOUT = get_config_value('tcp', 'socket_timeout', 120, int)
+# Отключить алгоритм Нейгла на клиентских сокетах: RTCM сообщения короткие и должны уходить без задержки
+TCP_NODELAY = get_config_value('tcp', 'nodelay', True, bool)
+
+# Явные размеры SO_RCVBUF/SO_SNDBUF клиентских сокетов (0 - не задавать).
+# Фиксированный размер отключает автонастройку окна TCP в Linux (net.ipv4.tcp_rmem/tcp_wmem),
+# поэтому по умолчанию буферы выбирает ядро
+TCP_RCVBUF_OVERRIDE = get_config_value('tcp', 'rcvbuf_override', 0, int) or None
+TCP_SNDBUF_OVERRIDE = get_config_value('tcp', 'sndbuf_override', 0, int) or None
 
 # ==================== Конфигурация пересылки данных ====================
 
@@ -51,6 +51,7 @@ class MountInfo:
     
     # Информация о таблице STR
     str_data: str = ""
+    str_bytes: bytes = b""  # str_data в UTF-8, кодируется один раз при изменении для таблицы источников
     initial_str_generated: bool = False
     final_str_generated: bool = False
     
@@ -512,34 +513,51 @@ class ConnectionManager:
                     mount_list.append(mount_info.str_data)
 
                 else:
-                    # Генерация информации в формате NTRIP по умолчанию
-                    mount_data = [
-                        'STR',
-                        mount_name, # Имя точки монтирования
-                        'none',  # Название города или другое описание, по умолчанию none
-                        'RTCM 3.3',  # format
-                        '1005(10)',  # format_details
-                        '0',  # carrier
-                        'GPS',  # nav_system
-                        '2RTK',  # network
-                        'CHN',  # country
-                        str(mount_info.lat) if mount_info.lat is not None else '0.0',  # latitude
-                        str(mount_info.lon) if mount_info.lon is not None else '0.0',  # longitude
-                        '0',  # nmea
-                        '0',  # solution
-                        mount_info.user_agent or 'unknown',  # generator
-                        'N',  # compression
-                        'B',  # authentication
-                        'N',  # fee
-                        '500',  # bitrate
-                        'NO'  # misc
-                    ]
-                    mount_info_str = ';'.join(mount_data)
-                    mount_list.append(mount_info_str)
-                    log_info(f"Создана таблица STR для точки монтирования {mount_name}: {mount_info_str}", 'connection_manager')
+                    mount_list.append(self._default_str_line(mount_name, mount_info))
         
         return mount_list
     
+    def generate_sourcetable_lines(self):
+        """Строки STR таблицы источников в байтах: готовые STR берутся без повторного кодирования"""
+        lines = []
+        
+        with self.mount_lock:
+            for mount_name, mount_info in self.online_mounts.items():
+                if mount_info.str_bytes:
+                    lines.append(mount_info.str_bytes)
+                else:
+                    lines.append(self._default_str_line(mount_name, mount_info).encode('utf-8'))
+        
+        return lines
+    
+    def _default_str_line(self, mount_name, mount_info):
+        """Строка STR по умолчанию для точки монтирования, для которой STR еще не сгенерирована"""
+        # Генерация информации в формате NTRIP по умолчанию
+        mount_data = [
+            'STR',
+            mount_name, # Имя точки монтирования
+            'none',  # Название города или другое описание, по умолчанию none
+            'RTCM 3.3',  # format
+            '1005(10)',  # format_details
+            '0',  # carrier
+            'GPS',  # nav_system
+            '2RTK',  # network
+            'CHN',  # country
+            str(mount_info.lat) if mount_info.lat is not None else '0.0',  # latitude
+            str(mount_info.lon) if mount_info.lon is not None else '0.0',  # longitude
+            '0',  # nmea
+            '0',  # solution
+            mount_info.user_agent or 'unknown',  # generator
+            'N',  # compression
+            'B',  # authentication
+            'N',  # fee
+            '500',  # bitrate
+            'NO'  # misc
+        ]
+        mount_info_str = ';'.join(mount_data)
+        log_info(f"Создана таблица STR для точки монтирования {mount_name}: {mount_info_str}", 'connection_manager')
+        return mount_info_str
+    
     def get_statistics(self):
         """Получение общей статистики"""
         with self.mount_lock, self.user_lock:
@@ -666,6 +684,7 @@ class ConnectionManager:
            
             
             mount_info.str_data = processed_str
+            mount_info.str_bytes = processed_str.encode('utf-8')
             if mode == "initial":
                 mount_info.initial_str_generated = True
             else:
@@ -848,6 +867,10 @@ def generate_mount_list():
     """Генерация данных списка точек монтирования"""
     return get_connection_manager().generate_mount_list()
 
+def generate_sourcetable_lines():
+    """Строки STR таблицы источников в байтах"""
+    return get_connection_manager().generate_sourcetable_lines()
+
 def check_mount_exists(mount_name):
     """Проверка существования точки монтирования"""
     return get_connection_manager().check_mount_exists(mount_name)
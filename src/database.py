@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 
 import sqlite3
+import hmac
 import hashlib
 import secrets
 import logging
+import time
+from contextlib import closing
 from threading import Lock
 from . import config
 from . import logger
@@ -11,27 +14,81 @@ from .logger import log_debug, log_info, log_warning, log_error, log_critical, l
 
 db_lock = Lock()
 
+# DELETE ... RETURNING поддерживается начиная с SQLite 3.35
+SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Кэш результатов аутентификации: {ключ: (expires_at, (is_valid, message))}
+# Роверы и базовые станции переподключаются с теми же учетными данными, повторная проверка
+# не выполняет запрос к базе и PBKDF2. Отказы кэшируются на меньший срок: повтор неверных
+# данных не нагружает базу, а исправленная учетная запись быстро начинает работать
+AUTH_CACHE_TTL = 60
+AUTH_FAILURE_CACHE_TTL = 5
+AUTH_CACHE_MAX = 8192
+_auth_cache = {}
+_auth_cache_lock = Lock()
+
+
+def _invalidate_auth_cache():
+    """Сброс кэша аутентификации (при изменении пользователей или точек монтирования)"""
+    with _auth_cache_lock:
+        _auth_cache.clear()
+
+
+def _secret_digest(secret):
+    # В ключах кэша хранится хеш пароля, а не сам пароль
+    if secret is None:
+        return None
+    return hashlib.sha256(secret.encode('utf-8')).digest()
+
+
+def _cached_auth(key, username, mount, verify):
+    """Вернуть результат проверки из кэша или выполнить verify() и сохранить результат"""
+    now = time.monotonic()
+    with _auth_cache_lock:
+        entry = _auth_cache.get(key)
+    if entry is not None and entry[0] > now:
+        is_valid, message = entry[1]
+        log_authentication(username or 'unknown', mount, is_valid, 'database', message)
+        return entry[1]
+    
+    result = verify()
+    ttl = AUTH_CACHE_TTL if result[0] else AUTH_FAILURE_CACHE_TTL
+    with _auth_cache_lock:
+        if len(_auth_cache) >= AUTH_CACHE_MAX:
+            # Удаление самой старой записи (dict сохраняет порядок вставки)
+            _auth_cache.pop(next(iter(_auth_cache)))
+        _auth_cache[key] = (now + ttl, result)
+    return result
+
+
+PBKDF2_ITERATIONS = 10000
+
 
 def hash_password(password, salt=None):
     """Хеширование пароля с использованием PBKDF2 и SHA256"""
     if salt is None:
         salt = secrets.token_hex(16)  
     
-    key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 10000)
+    key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), PBKDF2_ITERATIONS)
     return f"{salt}${key.hex()}"
 
 def verify_password(stored_password, provided_password):
     """Проверка соответствия пароля"""
+    salt, sep, hash_value = stored_password.partition('$')
+    if not sep:
+        # Пароль хранится в открытом виде (старый формат), сравнение за постоянное время
+        return hmac.compare_digest(stored_password.encode('utf-8'), provided_password.encode('utf-8'))
     
-    if '$' not in stored_password:
-       
-        return stored_password == provided_password
-        
-    salt, hash_value = stored_password.split('$', 1)
+    # Формат хранения "соль$hex" сохранен для совместимости с существующими базами,
+    # пароль и соль кодируются ровно один раз за проверку
+    try:
+        expected = bytes.fromhex(hash_value)
+    except ValueError:
+        return False
     
-    key = hashlib.pbkdf2_hmac('sha256', provided_password.encode(), salt.encode(), 10000)
+    key = hashlib.pbkdf2_hmac('sha256', provided_password.encode('utf-8'), salt.encode('utf-8'), PBKDF2_ITERATIONS)
     
-    return key.hex() == hash_value
+    return hmac.compare_digest(key, expected)
 
 def init_db():
     """Инициализация структуры таблиц SQLite базы данных"""
@@ -86,43 +143,54 @@ def init_db():
 def verify_mount_and_user(mount, username=None, password=None, mount_password=None, protocol_version="1.0"):
     """Проверка валидности точки монтирования и информации о пользователе
     
+    Результат кэшируется (см. AUTH_CACHE_TTL), ошибки базы данных не кэшируются.
+    
     Args:
         mount: Имя точки монтирования
         username: Имя пользователя (необязательно)
         password: Пароль пользователя (необязательно)
         mount_password: Пароль точки монтирования (необязательно)
     """
+    key = ('mount', mount, username, _secret_digest(password), _secret_digest(mount_password), protocol_version)
+    try:
+        return _cached_auth(key, username, mount,
+                            lambda: _verify_mount_and_user(mount, username, password, mount_password, protocol_version))
+    except Exception as e:
+        log_error(f"Ошибка аутентификации пользователя: {e}", exc_info=True)
+        return False, f"Ошибка аутентификации: {e}"
+
+
+def _verify_mount_and_user(mount, username, password, mount_password, protocol_version):
+    """Проверка точки монтирования и пользователя по базе данных (без кэша)"""
     with db_lock:
         conn = sqlite3.connect(config.DATABASE_PATH)
         c = conn.cursor()
         
         try:
-            # Проверка существования точки монтирования и получение связанной информации
-            c.execute("SELECT id, password, user_id FROM mounts WHERE mount = ?", (mount,))
-            mount_result = c.fetchone()
-            
-            if not mount_result:
-                log_authentication(username or 'unknown', mount, False, 'database', 'Точка монтирования не существует')
-                return False, "Точка монтирования не существует"
-            
-            mount_id, stored_mount_password, bound_user_id = mount_result
-            
             # Различная логика проверки в зависимости от версии протокола
             if protocol_version == "2.0":
+                # Точка монтирования и пользователь получаются одним запросом
+                c.execute("""SELECT m.user_id, u.id, u.password
+                             FROM mounts m
+                             LEFT JOIN users u ON u.username = ?
+                             WHERE m.mount = ?""", (username, mount))
+                mount_result = c.fetchone()
+                
+                if not mount_result:
+                    log_authentication(username or 'unknown', mount, False, 'database', 'Точка монтирования не существует')
+                    return False, "Точка монтирования не существует"
+                
+                bound_user_id, user_id, stored_user_password = mount_result
                 
                 if not username or not password:
                     log_authentication(username or 'unknown', mount, False, 'database', 'NTRIP 2.0 требует имя пользователя и пароль')
                     return False, "Протокол NTRIP 2.0 требует указание имени пользователя и пароля"
                 
                 # Проверка существования пользователя
-                c.execute("SELECT id, password FROM users WHERE username = ?", (username,))
-                user_result = c.fetchone()
-                if not user_result:
+                if user_id is None:
                     log_authentication(username, mount, False, 'database', 'Пользователь не существует')
                     return False, "Пользователь не существует"
                 
-                user_id, stored_user_password = user_result
-                
                 # Проверка пароля пользователя
                 if not verify_password(stored_user_password, password):
                     log_authentication(username, mount, False, 'database', 'Неверный пароль пользователя')
@@ -139,12 +207,19 @@ def verify_mount_and_user(mount, username=None, password=None, mount_password=No
             
             else:
                 # Логика проверки для NTRIP 1.0 и более старых версий
+                c.execute("SELECT password FROM mounts WHERE mount = ?", (mount,))
+                mount_result = c.fetchone()
+                
+                if not mount_result:
+                    log_authentication(username or 'unknown', mount, False, 'database', 'Точка монтирования не существует')
+                    return False, "Точка монтирования не существует"
+                
                 if not mount_password:
                     log_authentication(username or 'unknown', mount, False, 'database', 'NTRIP 1.0 требует пароль точки монтирования')
                     return False, "Протокол NTRIP 1.0 требует указание пароля точки монтирования"
                 
-                # Проверка пароля точки монтирования
-                if stored_mount_password != mount_password:
+                # Проверка пароля точки монтирования (сравнение за постоянное время)
+                if not hmac.compare_digest(mount_result[0].encode('utf-8'), mount_password.encode('utf-8')):
                     log_authentication(username or 'unknown', mount, False, 'database', 'Неверный пароль точки монтирования')
                     return False, "Неверный пароль точки монтирования"
                 
@@ -152,9 +227,6 @@ def verify_mount_and_user(mount, username=None, password=None, mount_password=No
                 log_authentication(username or 'unknown', mount, True, 'database', 'Аутентификация NTRIP 1.0 успешна')
                 return True, "Аутентификация NTRIP 1.0 успешна"
             
-        except Exception as e:
-            log_error(f"Ошибка аутентификации пользователя: {e}", exc_info=True)
-            return False, f"Ошибка аутентификации: {e}"
         finally:
             conn.close()
 
@@ -175,6 +247,7 @@ def add_user(username, password):
             hashed_password = hash_password(password)
             c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, hashed_password))
             conn.commit()
+            _invalidate_auth_cache()
             log_database_operation('add_user', 'users', True, f'Пользователь: {username}')
             return True, "Пользователь успешно добавлен"
         except Exception as e:
@@ -204,6 +277,7 @@ def update_user(user_id, username, password):
             
             c.execute("UPDATE users SET username = ?, password = ? WHERE id = ?", (username, new_password, user_id))
             conn.commit()
+            _invalidate_auth_cache()
             log_database_operation('update_user', 'users', True, f'Пользователь: {username}')
             return True, "Информация о пользователе успешно обновлена"
         except Exception as e:
@@ -218,21 +292,34 @@ def delete_user(user_id):
         conn = sqlite3.connect(config.DATABASE_PATH)
         c = conn.cursor()
         try:
-            
-            c.execute("SELECT username FROM users WHERE id = ?", (user_id,))
-            result = c.fetchone()
-            if not result:
-                return False, "Пользователь не существует"
-            
-            username = result[0]
-            
-            # Сначала очистить user_id всех точек монтирования, привязанных к этому пользователю
-            c.execute("UPDATE mounts SET user_id = NULL WHERE user_id = ?", (user_id,))
-            affected_mounts = c.rowcount
-            
-            # Удаление пользователя
-            c.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            if SQLITE_HAS_RETURNING:
+                # Очистка привязки и удаление в одной транзакции, имя пользователя возвращается самим DELETE
+                c.execute("UPDATE mounts SET user_id = NULL WHERE user_id = ?", (user_id,))
+                affected_mounts = c.rowcount
+                
+                c.execute("DELETE FROM users WHERE id = ? RETURNING username", (user_id,))
+                result = c.fetchone()
+                if not result:
+                    conn.rollback()
+                    return False, "Пользователь не существует"
+                
+                username = result[0]
+            else:
+                c.execute("SELECT username FROM users WHERE id = ?", (user_id,))
+                result = c.fetchone()
+                if not result:
+                    return False, "Пользователь не существует"
+                
+                username = result[0]
+                
+                # Сначала очистить user_id всех точек монтирования, привязанных к этому пользователю
+                c.execute("UPDATE mounts SET user_id = NULL WHERE user_id = ?", (user_id,))
+                affected_mounts = c.rowcount
+                
+                # Удаление пользователя
+                c.execute("DELETE FROM users WHERE id = ?", (user_id,))
             conn.commit()
+            _invalidate_auth_cache()
             
             log_message = f'Пользователь: {username}'
             if affected_mounts > 0:
@@ -246,17 +333,24 @@ def delete_user(user_id):
         finally:
             conn.close()
 
-def get_all_users():
-    """Получение списка всех пользователей"""
+def _iter_all_users():
+    """Потоковый обход всех пользователей.
+    
+    Блокировка базы данных удерживается до конца обхода, поэтому генератор используется
+    только внутри модуля: полностью (list) или в with closing(...)
+    """
     with db_lock:
         conn = sqlite3.connect(config.DATABASE_PATH)
-        c = conn.cursor()
+        conn.row_factory = sqlite3.Row
         try:
-            c.execute("SELECT id, username, password FROM users")
-            return c.fetchall()
+            yield from conn.execute("SELECT id, username, password FROM users")
         finally:
             conn.close()
 
+def get_all_users():
+    """Получение списка всех пользователей"""
+    return list(_iter_all_users())
+
 def update_user_password(username, new_password):
     """Обновление пароля пользователя"""
     with db_lock:
@@ -274,6 +368,7 @@ def update_user_password(username, new_password):
             
             c.execute("UPDATE users SET password = ? WHERE username = ?", (hashed_password, username))
             conn.commit()
+            _invalidate_auth_cache()
             log_info(f"Пароль пользователя {username} успешно обновлен")
             return True, "Пароль успешно обновлен"
         except Exception as e:
@@ -301,6 +396,7 @@ def add_mount(mount, password, user_id=None):
             
             c.execute("INSERT INTO mounts (mount, password, user_id) VALUES (?, ?, ?)", (mount, password, user_id))
             conn.commit()
+            _invalidate_auth_cache()
             log_database_operation('add_mount', 'mounts', True, f'Точка монтирования: {mount}, ID пользователя: {user_id}')
             return True, "Точка монтирования успешно добавлена"
         except Exception as e:
@@ -341,6 +437,7 @@ def update_mount(mount_id, mount=None, password=None, user_id=None):
             
             c.execute("UPDATE mounts SET mount = ?, password = ?, user_id = ? WHERE id = ?", (new_mount, new_password, new_user_id, mount_id))
             conn.commit()
+            _invalidate_auth_cache()
             log_database_operation('update_mount', 'mounts', True, f'Точка монтирования: {old_mount} -> {new_mount}')
             return True, old_mount
         except Exception as e:
@@ -355,15 +452,23 @@ def delete_mount(mount_id):
         conn = sqlite3.connect(config.DATABASE_PATH)
         c = conn.cursor()
         try:
-            
-            c.execute("SELECT mount FROM mounts WHERE id = ?", (mount_id,))
-            result = c.fetchone()
-            if not result:
-                return False, "Точка монтирования не существует"
-            
-            mount = result[0]
-            c.execute("DELETE FROM mounts WHERE id = ?", (mount_id,))
+            if SQLITE_HAS_RETURNING:
+                c.execute("DELETE FROM mounts WHERE id = ? RETURNING mount", (mount_id,))
+                result = c.fetchone()
+                if not result:
+                    return False, "Точка монтирования не существует"
+                
+                mount = result[0]
+            else:
+                c.execute("SELECT mount FROM mounts WHERE id = ?", (mount_id,))
+                result = c.fetchone()
+                if not result:
+                    return False, "Точка монтирования не существует"
+                
+                mount = result[0]
+                c.execute("DELETE FROM mounts WHERE id = ?", (mount_id,))
             conn.commit()
+            _invalidate_auth_cache()
             log_database_operation('delete_mount', 'mounts', True, f'Точка монтирования: {mount}')
             return True, mount
         except Exception as e:
@@ -372,14 +477,15 @@ def delete_mount(mount_id):
         finally:
             conn.close()
 
-def get_all_mounts():
-    """Получение списка всех точек монтирования"""
+def _iter_all_mounts():
+    """Потоковый обход всех точек монтирования (ограничения те же, что у _iter_all_users)"""
     with db_lock:
         conn = sqlite3.connect(config.DATABASE_PATH)
+        conn.row_factory = sqlite3.Row
         c = conn.cursor()
         try:
             c.execute("PRAGMA table_info(mounts)")
-            columns = [column[1] for column in c.fetchall()]
+            columns = {column[1] for column in c}
             
             if 'lat' in columns and 'lon' in columns:
                 c.execute("""SELECT m.id, m.mount, m.password, m.user_id, u.username, m.lat, m.lon
@@ -389,10 +495,14 @@ def get_all_mounts():
                 c.execute("""SELECT m.id, m.mount, m.password, m.user_id, u.username, NULL as lat, NULL as lon
                              FROM mounts m 
                              LEFT JOIN users u ON m.user_id = u.id""")
-            return c.fetchall()
+            yield from c
         finally:
             conn.close()
 
+def get_all_mounts():
+    """Получение списка всех точек монтирования"""
+    return list(_iter_all_mounts())
+
 
 def verify_admin(username, password):
     """Проверка имени пользователя и пароля администратора"""
@@ -426,6 +536,106 @@ def update_admin_password(username, new_password):
             conn.close()
 
 
+def _verify_download_user(mount, username, password):
+    """Проверка пользователя для скачивания по базе данных (без кэша)"""
+    with sqlite3.connect(config.DATABASE_PATH) as conn:
+        c = conn.cursor()
+        
+        c.execute("SELECT id FROM mounts WHERE mount = ?", (mount,))
+        mount_result = c.fetchone()
+        if not mount_result:
+            logger.log_authentication(username, mount, False, 'database', 'Точка монтирования не существует')
+            return False, "Точка монтирования не существует"
+        
+        c.execute("SELECT id, password FROM users WHERE username = ?", (username,))
+        user_result = c.fetchone()
+        if not user_result:
+            logger.log_authentication(username, mount, False, 'database', 'Пользователь не существует')
+            return False, "Пользователь не существует"
+        
+        user_id, stored_password = user_result
+        
+        if not verify_password(stored_password, password):
+            logger.log_authentication(username, mount, False, 'database', 'Неверный пароль пользователя')
+            return False, "Неверный пароль пользователя"
+        
+        logger.log_authentication(username, mount, True, 'database', 'Аутентификация для загрузки успешна')
+        return True, "Аутентификация для загрузки успешна"
+
+
+def _fetch_user_and_mount(mount, username):
+    """Пароль пользователя и данные точки монтирования одним запросом (без кэша)
+    
+    Returns:
+        (stored_password, user_id, mount_row): mount_row = (mount_password, bound_user_id)
+        или None, если точки монтирования нет; stored_password и user_id равны None, если нет пользователя
+    """
+    with sqlite3.connect(config.DATABASE_PATH) as conn:
+        row = conn.execute("""SELECT u.password, u.id, m.id, m.password, m.user_id
+                              FROM (SELECT ? AS username, ? AS mount) q
+                              LEFT JOIN users u ON u.username = q.username
+                              LEFT JOIN mounts m ON m.mount = q.mount""", (username, mount)).fetchone()
+    stored_password, user_id, mount_id, mount_password, bound_user_id = row
+    mount_row = (mount_password, bound_user_id) if mount_id is not None else None
+    return stored_password, user_id, mount_row
+
+
+def fetch_user_and_mount(mount, username):
+    """Данные для Digest-аутентификации (кэшируются вместе с результатами аутентификации)"""
+    key = ('digest', mount, username)
+    now = time.monotonic()
+    with _auth_cache_lock:
+        entry = _auth_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    
+    record = _fetch_user_and_mount(mount, username)
+    ttl = AUTH_CACHE_TTL if record[0] and record[2] is not None else AUTH_FAILURE_CACHE_TTL
+    with _auth_cache_lock:
+        if len(_auth_cache) >= AUTH_CACHE_MAX:
+            _auth_cache.pop(next(iter(_auth_cache)))
+        _auth_cache[key] = (now + ttl, record)
+    return record
+
+
+def check_digest_access(record, mount, username, protocol_version="1.0", request_type="upload"):
+    """Проверка прав по данным fetch_user_and_mount после успешной проверки Digest ответа
+    
+    Digest ответ вычисляется от хранимого значения пароля, поэтому повторная проверка пароля
+    сводится к тому, что пароль хранится в открытом виде: для хеша "соль$hex" это значение
+    не является паролем пользователя.
+    """
+    stored_password, user_id, mount_row = record
+    
+    if mount_row is None:
+        log_authentication(username, mount, False, 'database', 'Точка монтирования не существует')
+        return False, "Точка монтирования не существует"
+    mount_password, bound_user_id = mount_row
+    
+    if request_type != "download" and protocol_version != "2.0":
+        # NTRIP 1.0: пароль точки монтирования должен совпадать с паролем пользователя
+        if not hmac.compare_digest(mount_password.encode('utf-8'), stored_password.encode('utf-8')):
+            log_authentication(username, mount, False, 'database', 'Неверный пароль точки монтирования')
+            return False, "Неверный пароль точки монтирования"
+        log_authentication(username, mount, True, 'database', 'Аутентификация NTRIP 1.0 успешна')
+        return True, "Аутентификация NTRIP 1.0 успешна"
+    
+    if '$' in stored_password:
+        log_authentication(username, mount, False, 'database', 'Неверный пароль пользователя')
+        return False, "Неверный пароль пользователя"
+    
+    if request_type == "download":
+        log_authentication(username, mount, True, 'database', 'Аутентификация для загрузки успешна')
+        return True, "Аутентификация для загрузки успешна"
+    
+    if bound_user_id is not None and bound_user_id != user_id:
+        log_authentication(username, mount, False, 'database', 'У пользователя нет прав доступа к этой точке монтирования')
+        return False, "У пользователя нет прав доступа к этой точке монтирования"
+    
+    log_authentication(username, mount, True, 'database', 'Аутентификация NTRIP 2.0 успешна')
+    return True, "Аутентификация NTRIP 2.0 успешна"
+
+
 class DatabaseManager:
     """Класс менеджера базы данных, обертка для функций работы с базой данных"""
     
@@ -451,12 +661,13 @@ class DatabaseManager:
     
     def delete_user(self, username):
         """Удаление пользователя"""
-        users = get_all_users()
         user_id = None
-        for user in users:
-            if user[1] == username:  # user[1] это username
-                user_id = user[0]    # user[0] это id
-                break
+        # closing() освобождает блокировку базы данных сразу после break
+        with closing(_iter_all_users()) as users:
+            for user in users:
+                if user['username'] == username:
+                    user_id = user['id']
+                    break
         
         if user_id is None:
             return False, "Пользователь не существует"
@@ -467,13 +678,13 @@ class DatabaseManager:
         """Получение всех пользователей"""
         return get_all_users()
     
-    def get_user_password(self, username):
-        """Получение пароля пользователя для Digest-аутентификации"""
-        with sqlite3.connect(config.DATABASE_PATH) as conn:
-            c = conn.cursor()
-            c.execute("SELECT password FROM users WHERE username = ?", (username,))
-            result = c.fetchone()
-            return result[0] if result else None
+    def fetch_user_and_mount(self, mount, username):
+        """Пароль пользователя и точка монтирования для Digest-аутентификации одним запросом"""
+        return fetch_user_and_mount(mount, username)
+    
+    def check_digest_access(self, record, mount, username, protocol_version="1.0", request_type="upload"):
+        """Проверка прав доступа по уже полученным данным, без обращения к базе"""
+        return check_digest_access(record, mount, username, protocol_version, request_type)
     
     def check_mount_exists_in_db(self, mount):
         """Проверка существования точки монтирования в базе данных"""
@@ -483,31 +694,12 @@ class DatabaseManager:
             return c.fetchone() is not None
     
     def verify_download_user(self, mount, username, password):
-        """Проверка пользователя для загрузки, проверяется только имя пользователя и пароль, не проверяется привязка точки монтирования"""
-        with sqlite3.connect(config.DATABASE_PATH) as conn:
-            c = conn.cursor()
-            
-            c.execute("SELECT id FROM mounts WHERE mount = ?", (mount,))
-            mount_result = c.fetchone()
-            if not mount_result:
-                logger.log_authentication(username, mount, False, 'database', 'Точка монтирования не существует')
-                return False, "Точка монтирования не существует"
-            
-            c.execute("SELECT id, password FROM users WHERE username = ?", (username,))
-            user_result = c.fetchone()
-            if not user_result:
-                logger.log_authentication(username, mount, False, 'database', 'Пользователь не существует')
-                return False, "Пользователь не существует"
-            
-            user_id, stored_password = user_result
-            
-            if not verify_password(stored_password, password):
-                logger.log_authentication(username, mount, False, 'database', 'Неверный пароль пользователя')
-                return False, "Неверный пароль пользователя"
-            
-           
-            logger.log_authentication(username, mount, True, 'database', 'Аутентификация для загрузки успешна')
-            return True, "Аутентификация для загрузки успешна"
+        """Проверка пользователя для загрузки, проверяется только имя пользователя и пароль, не проверяется привязка точки монтирования
+        
+        Результат кэшируется (см. AUTH_CACHE_TTL).
+        """
+        key = ('download', mount, username, _secret_digest(password))
+        return _cached_auth(key, username, mount, lambda: _verify_download_user(mount, username, password))
     
     def add_mount(self, mount, password=None, user_id=None):
         """Добавление точки монтирования"""
@@ -522,6 +714,7 @@ class DatabaseManager:
                 c.execute("UPDATE mounts SET password = ? WHERE mount = ?", (new_password, mount))
                 if c.rowcount > 0:
                     conn.commit()
+                    _invalidate_auth_cache()
                     return True, "Пароль точки монтирования успешно обновлен"
                 else:
                     return False, "Точка монтирования не существует"
@@ -540,12 +733,12 @@ class DatabaseManager:
     
     def delete_mount(self, mount):
         """Удаление точки монтирования"""
-        mounts = self.get_all_mounts()
         mount_id = None
-        for m in mounts:
-            if m[1] == mount:  # m[1] это имя точки монтирования
-                mount_id = m[0]  # m[0] это ID
-                break
+        with closing(_iter_all_mounts()) as mounts:
+            for m in mounts:
+                if m['mount'] == mount:
+                    mount_id = m['id']
+                    break
         
         if mount_id is None:
             return False, "Точка монтирования не существует"
@@ -555,6 +748,7 @@ class DatabaseManager:
     def get_all_mounts(self):
         """Получение всех точек монтирования"""
         return get_all_mounts()
+    
        
     def verify_admin(self, username, password):
         """Проверка администратора"""
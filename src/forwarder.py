@@ -149,6 +149,11 @@ class SimpleDataForwarder:
         self.broadcast_thread = threading.Thread(target=self._broadcast_loop, daemon=True)
         self.broadcast_thread.start()
         logger.log_system_event('Пересылка данных запущена')
+        if config.TCP_SNDBUF_OVERRIDE or config.TCP_RCVBUF_OVERRIDE:
+            logger.log_warning(
+                f"Размеры буферов сокета заданы вручную (sndbuf={config.TCP_SNDBUF_OVERRIDE}, "
+                f"rcvbuf={config.TCP_RCVBUF_OVERRIDE}): автонастройка окна TCP отключена, "
+                f"см. /proc/sys/net/ipv4/tcp_rmem и tcp_wmem", 'ntrip')
     
     def stop(self):
         """Остановка потока рассылки"""
@@ -267,10 +272,6 @@ class SimpleDataForwarder:
                 # logger.log_debug("TCP Keep-Alive включен (используются системные параметры по умолчанию)", 'ntrip')
                 pass
             
-            
-            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.BUFFER_SIZE)
-            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, config.BUFFER_SIZE)
-            
         except Exception as e:
             logger.log_warning(f"Ошибка при настройке TCP Keep-Alive: {e}", 'ntrip')
     
@@ -310,6 +311,11 @@ class SimpleDataForwarder:
         """Закрытие подключения клиента"""
         try:
             socket_obj = client_info['socket']
+            try:
+                # shutdown будит поток, ожидающий события на этом сокете
+                socket_obj.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             socket_obj.close()
         except Exception as e:
             logger.log_debug(f"Ошибка при закрытии подключения клиента: {e}", 'ntrip')
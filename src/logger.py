@@ -3,12 +3,19 @@
 
 
 import os
+import re
 import sys
+import time
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 from pathlib import Path
 import threading
+from collections import OrderedDict, deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 # Импорт конфигурации
 try:
@@ -30,76 +37,329 @@ except ImportError:
     
     config = DefaultConfig()
 
+# Объем буфера файлового обработчика и период принудительного сброса на диск
+LOG_BUFFER_SIZE = 64 * 1024
+LOG_FLUSH_INTERVAL = 1.0
+
+
+# Частые сообщения, которые не отправляются на Web фронтенд
+WEB_FILTERED_KEYWORDS = (
+    'Обновление активности пользователя', 'MSM', 'Спутник', 'Отправка данных', 'Подключение клиента',
+    'RTCM data', 'Performance:', 'Database', 'bytes for mount'
+)
+_WEB_FILTER_RE = re.compile('|'.join(map(re.escape, WEB_FILTERED_KEYWORDS)))
+
+# Максимальное число сообщений, ожидающих рассылки на Web фронтенд
+WEB_PUSH_QUEUE_SIZE = 1024
+
+
+# Окно подавления повторов одинаковых сообщений (с) и размер таблицы отслеживаемых сообщений
+LOG_DEDUP_WINDOW = 1.0
+LOG_DEDUP_MAX_ENTRIES = 1024
+
+
+class DedupFilter(logging.Filter):
+    """
+    Фильтр повторяющихся сообщений: одинаковые записи (логгер, уровень, текст),
+    приходящие чаще окна подавления, не пишутся, а учитываются счетчиком,
+    который периодически выводится одной сводной записью (collect())
+    """
+    
+    def __init__(self, window=LOG_DEDUP_WINDOW, max_entries=LOG_DEDUP_MAX_ENTRIES):
+        super().__init__()
+        self.window = window
+        self.max_entries = max_entries
+        self._lru = OrderedDict()  # ключ -> [время последней записи, число подавленных, последняя подавленная запись]
+        self._evicted = []
+        self._lock = threading.Lock()
+    
+    def filter(self, record):
+        if getattr(record, 'dedup_summary', False):
+            return True
+        
+        key = (record.name, record.levelno, record.msg)
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+                repeated = record.created - entry[0] < self.window
+                entry[0] = record.created
+                if repeated:
+                    entry[1] += 1
+                    entry[2] = record
+                    return False
+                return True
+            
+            self._lru[key] = [record.created, 0, None]
+            if len(self._lru) > self.max_entries:
+                _, evicted = self._lru.popitem(last=False)
+                if evicted[1]:
+                    self._evicted.append(self._summary(evicted))
+        return True
+    
+    @staticmethod
+    def _summary(entry):
+        """Сводная запись о подавленных повторах.
+        
+        Единственный подавленный повтор выводится как есть: сводка не сократила бы число строк
+        """
+        record = logging.makeLogRecord(entry[2].__dict__)
+        if entry[1] > 1:
+            record.msg = f"Message repeated {entry[1]} times: {entry[2].msg}"
+            record.args = None
+        record.dedup_summary = True
+        return record
+    
+    def collect(self):
+        """Получение сводных записей по накопленным повторам со сбросом счетчиков"""
+        with self._lock:
+            summaries, self._evicted = self._evicted, []
+            for entry in self._lru.values():
+                if entry[1]:
+                    summaries.append(self._summary(entry))
+                    entry[1], entry[2] = 0, None
+        return summaries
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler с буферизацией: записи копятся в памяти и пишутся
+    на диск одним вызовом при заполнении буфера, по таймеру (flush())
+    или сразу для сообщений уровня WARNING и выше
+    """
+    
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding='utf-8',
+                 buffer_size=LOG_BUFFER_SIZE, flush_level=logging.WARNING):
+        self._buffer = bytearray()
+        self._file_size = 0
+        self.buffer_size = buffer_size
+        self.flush_level = flush_level
+        # Файл открывается при первой записи (delay), процессы без сообщений уровня файла его не создают
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding, delay=True)
+    
+    def _open(self):
+        # Файл открывается в двоичном режиме: в него пишется уже закодированный буфер
+        stream = open(self.baseFilename, 'ab')
+        # Размер файла запоминается при открытии и дальше учитывается счетчиком без обращений к ФС
+        self._file_size = os.fstat(stream.fileno()).st_size
+        return stream
+    
+    def _write_buffer(self):
+        """Запись накопленного буфера в файл"""
+        if self._buffer and self.stream is not None:
+            self.stream.write(self._buffer)
+            self.stream.flush()
+            self._file_size += len(self._buffer)
+            self._buffer.clear()
+    
+    def shouldRollover(self, record):
+        return self.maxBytes > 0 and self._file_size + len(self._buffer) >= self.maxBytes
+    
+    def emit(self, record):
+        try:
+            data = (self.format(record) + self.terminator).encode(self.encoding, self.errors or 'strict')
+            if self.stream is None:
+                self.stream = self._open()
+            
+            if self.maxBytes > 0 and self._file_size + len(self._buffer) + len(data) >= self.maxBytes:
+                self._write_buffer()
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            
+            self._buffer += data
+            if len(self._buffer) >= self.buffer_size or record.levelno >= self.flush_level:
+                self._write_buffer()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+
+
+class FastFormatter(logging.Formatter):
+    """
+    Formatter с кэшированием строки времени: формат даты без долей секунды,
+    поэтому strftime вызывается не чаще одного раза в секунду
+    """
+    
+    def __init__(self, fmt=None, datefmt=None):
+        super().__init__(fmt, datefmt)
+        self._time_cache = (None, None)  # (секунда, строка времени)
+    
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, cached_time = self._time_cache
+        if second != cached_second:
+            cached_time = time.strftime(datefmt or self.default_time_format, self.converter(second))
+            self._time_cache = (second, cached_time)
+        return cached_time
+
+
+class RoutingQueueListener(QueueListener):
+    """
+    Фоновый поток записи логов: запись из общей очереди передается
+    только обработчикам того логгера, которым она была создана
+    """
+    
+    def __init__(self, log_queue, routes, default_route):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.routes = routes
+        self.default_route = default_route
+    
+    def handle(self, record):
+        record = self.prepare(record)
+        for handler in self.routes.get(record.name, self.default_route):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
 class NTRIPLogger:
     """
     Менеджер логирования NTRIP Caster
 
     """
     
-    _instance = None
-    _lock = threading.Lock()
     _web_instance = None  
-    
-    def __new__(cls):
-        """Реализация паттерна Singleton"""
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super(NTRIPLogger, cls).__new__(cls)
-        return cls._instance
+    _web_push = None  # Связанный метод push_log_message экземпляра Web
     
     def __init__(self):
         """Инициализация системы логирования"""
-        if hasattr(self, '_initialized'):
-            return
-        
-        self._initialized = True
         self._loggers = {}
+        self._handlers = []
+        self._routes = {}
+        self._listener = None
+        self._dedup_filters = []
+        self._shutdown_event = threading.Event()
+        self._web_queue = deque(maxlen=WEB_PUSH_QUEUE_SIZE)
+        self._web_event = threading.Event()
         self._setup_logging()
+        
+        # Методы записи по уровням: log_xxx(message, module=..., exc_info=False)
+        # Отладочные логи не отправляются на фронтенд, чтобы избежать перегрузки
+        self.log_info = partial(self._emit, logging.INFO, 'main', 'info')
+        self.log_debug = partial(self._emit, logging.DEBUG, 'main', None)
+        self.log_warning = partial(self._emit, logging.WARNING, 'main', 'warning')
+        self.log_error = partial(self._emit, logging.ERROR, 'error', 'error')
+        self.log_critical = partial(self._emit, logging.CRITICAL, 'error', 'error')
+        
+        threading.Thread(target=self._web_pump, name='LogWebPump', daemon=True).start()
     
     def _setup_logging(self):
         """Настройка системы логирования"""
         
+        # Параметры конфигурации читаются один раз
         log_dir = Path(config.LOG_DIR)
         log_dir.mkdir(exist_ok=True)
+        max_bytes = config.LOG_MAX_SIZE
+        backup_count = config.LOG_BACKUP_COUNT
+        log_files = config.LOG_FILES
+        self._root_level = getattr(logging, config.LOG_LEVEL.upper())
+        self._console_debug = config.DEBUG
         
-        
-        formatter = logging.Formatter(
+        formatter = FastFormatter(
             config.LOG_FORMAT,
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         
+        # Логгеры только кладут записи в очередь, запись на диск выполняет отдельный поток
+        self._log_queue = queue.SimpleQueue()
+        
+        # Один обработчик на каждый файл лога, общий для всех логгеров, пишущих в этот файл.
+        # Уровень задается только там, где через обработчик идут записи корневого логгера
+        self._file_handlers = {
+            name: self._create_file_handler(str(log_dir / log_files[file_key]), level, formatter,
+                                            max_bytes, backup_count)
+            for name, file_key, level in (
+                ('main', 'main', logging.INFO),
+                ('ntrip', 'ntrip', logging.NOTSET),
+                ('error', 'errors', logging.ERROR),
+            )
+        }
+        
         # Создание регистраторов логов различных типов
-        self._create_logger('main', config.LOG_FILES['main'], logging.INFO, formatter)
-        self._create_logger('ntrip', config.LOG_FILES['ntrip'], logging.DEBUG, formatter)
-        self._create_logger('error', config.LOG_FILES['errors'], logging.ERROR, formatter)
+        self._create_logger('main', logging.INFO, formatter)
+        self._create_logger('ntrip', logging.DEBUG, formatter)
+        self._create_logger('error', logging.ERROR, formatter)
         
         self._create_root_logger(formatter)
-    
-    def _create_logger(self, name, filename, level, formatter):
-        """Создание регистратора логов указанного типа"""
-        logger = logging.getLogger(f'ntrip.{name}')
-        logger.setLevel(level)
         
-        logger.handlers.clear()
+        # Кэш логгеров по имени модуля, в том числе созданных через get_logger
+        self._module_loggers = dict(self._loggers)
+        
+        # Записи дочерних логгеров ntrip.* без собственных обработчиков обрабатываются как записи корневого
+        self._listener = RoutingQueueListener(self._log_queue, self._routes, self._routes['ntrip'])
+        self._listener.start()
+        atexit.register(self._stop_listener)
         
-        file_path = os.path.join(config.LOG_DIR, filename)
-        file_handler = RotatingFileHandler(
+        threading.Thread(target=self._flush_loop, name='LogFlusher', daemon=True).start()
+    
+    def _flush_loop(self):
+        """Периодический сброс буферов файловых обработчиков на диск"""
+        while not self._shutdown_event.wait(LOG_FLUSH_INTERVAL):
+            self._flush_dedup_summaries()
+            for handler in self._handlers:
+                handler.flush()
+    
+    def _flush_dedup_summaries(self):
+        """Запись сводок о подавленных повторах в соответствующие файлы"""
+        for handler, dedup_filter in self._dedup_filters:
+            for record in dedup_filter.collect():
+                handler.handle(record)
+    
+    def _stop_listener(self):
+        """Остановка потока записи с выгрузкой оставшихся в очереди записей"""
+        self._shutdown_event.set()
+        self._web_event.set()
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+            self._flush_dedup_summaries()
+    
+    def _attach(self, logger, handlers):
+        """Подключение логгера к общей очереди с регистрацией его обработчиков в потоке записи"""
+        self._routes[logger.name] = handlers
+        self._handlers.extend(handler for handler in handlers if handler not in self._handlers)
+        logger.addHandler(QueueHandler(self._log_queue))
+    
+    def _create_file_handler(self, file_path, level, formatter, max_bytes, backup_count):
+        """Создание файлового обработчика с ротацией"""
+        file_handler = BufferedRotatingFileHandler(
             file_path,
-            maxBytes=config.LOG_MAX_SIZE,
-            backupCount=config.LOG_BACKUP_COUNT,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
             encoding='utf-8'
         )
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
         
-        if config.DEBUG or level >= logging.ERROR:
+        dedup_filter = DedupFilter()
+        file_handler.addFilter(dedup_filter)
+        self._dedup_filters.append((file_handler, dedup_filter))
+        return file_handler
+    
+    def _create_logger(self, name, level, formatter):
+        """Создание регистратора логов указанного типа"""
+        logger = logging.getLogger(f'ntrip.{name}')
+        logger.setLevel(level)
+        
+        logger.handlers.clear()
+        
+        handlers = [self._file_handlers[name]]
+        
+        if self._console_debug or level >= logging.ERROR:
+            # Уровень консольного обработчика совпадает с уровнем логгера и отдельно не задается
             console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setLevel(level)
             console_handler.setFormatter(formatter)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
         
+        self._attach(logger, handlers)
         logger.propagate = False
         
         self._loggers[name] = logger
@@ -107,49 +367,30 @@ class NTRIPLogger:
     def _create_root_logger(self, formatter):
         """Создание корневого регистратора логов"""
         root_logger = logging.getLogger('ntrip')
-        root_logger.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
+        root_logger.setLevel(self._root_level)
         
         root_logger.handlers.clear()
         
-        main_file_path = os.path.join(config.LOG_DIR, config.LOG_FILES['main'])
-        main_handler = RotatingFileHandler(
-            main_file_path,
-            maxBytes=config.LOG_MAX_SIZE,
-            backupCount=config.LOG_BACKUP_COUNT,
-            encoding='utf-8'
-        )
-        main_handler.setLevel(logging.INFO)
-        main_handler.setFormatter(formatter)
-        root_logger.addHandler(main_handler)
-        
-        error_file_path = os.path.join(config.LOG_DIR, config.LOG_FILES['errors'])
-        error_handler = RotatingFileHandler(
-            error_file_path,
-            maxBytes=config.LOG_MAX_SIZE,
-            backupCount=config.LOG_BACKUP_COUNT,
-            encoding='utf-8'
-        )
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(formatter)
-        root_logger.addHandler(error_handler)
+        # Корневой логгер пишет в те же main.log и errors.log через общие обработчики,
+        # разделение INFO/ERROR обеспечивают уровни этих обработчиков
+        handlers = [self._file_handlers['main'], self._file_handlers['error']]
         
-        if config.DEBUG:
+        if self._console_debug:
             console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
             console_handler.setFormatter(formatter)
-            root_logger.addHandler(console_handler)
+            handlers.append(console_handler)
         
+        self._attach(root_logger, handlers)
         self._loggers['root'] = root_logger
     
     def get_logger(self, name='root'):
         """Получение регистратора логов с указанным именем"""
-        if name in self._loggers:
-            return self._loggers[name]
-        else:
-            
+        logger = self._module_loggers.get(name)
+        if logger is None:
             logger = logging.getLogger(f'ntrip.{name}')
-            logger.setLevel(getattr(logging, config.LOG_LEVEL.upper()))
-            return logger
+            logger.setLevel(self._root_level)
+            self._module_loggers[name] = logger
+        return logger
     
     @classmethod
     def set_web_instance(cls, web_instance):
@@ -157,6 +398,7 @@ class NTRIPLogger:
         Установка ссылки на экземпляр Web для рассылки логов в реальном времени
 
         """
+        cls._web_push = getattr(web_instance, 'push_log_message', None)
         cls._web_instance = web_instance
     
     def _push_to_web(self, message, log_type='info'):
@@ -165,178 +407,209 @@ class NTRIPLogger:
             log_type: Тип лога ('info', 'warning', 'error', 'debug')
         """
         # Фильтрация частых логов, чтобы избежать перегрузки фронтенда
-        filtered_keywords = [
-            'Обновление активности пользователя', 'MSM', 'Спутник', 'Отправка данных', 'Подключение клиента',
-            'RTCM data', 'Performance:', 'Database', 'bytes for mount'
-        ]
-        
-        # Проверка наличия ключевых слов для фильтрации
-        if any(keyword in message for keyword in filtered_keywords):
+        if _WEB_FILTER_RE.search(message):
             return  # Не отправлять эти частые логи на фронтенд
+        
+        # Рассылку выполняет отдельный поток, при переполнении очереди отбрасываются самые старые сообщения
+        if self._web_push is not None:
+            self._web_queue.append((message, log_type))
+            self._web_event.set()
+    
+    def _web_pump(self):
+        """Поток рассылки логов на Web фронтенд"""
+        while not self._shutdown_event.is_set():
+            self._web_event.wait()
+            self._web_event.clear()
             
-        if self._web_instance and hasattr(self._web_instance, 'push_log_message'):
-            try:
-                self._web_instance.push_log_message(message, log_type)
-            except Exception:
-                # Избегаем влияния сбоя рассылки логов на основную функциональность
-                pass
-    
-    def log_info(self, message, module='main'):
-        """Запись информационного лога"""
-        logger = self.get_logger(module)
-        logger.info(message)
-        self._push_to_web(message, 'info')
-    
-    def log_debug(self, message, module='main'):
-        """Запись отладочного лога"""
-        logger = self.get_logger(module)
-        logger.debug(message)
-        # Не отправлять отладочные логи на фронтенд, чтобы избежать перегрузки
-        # if config.DEBUG:  # Отправлять отладочные логи только в режиме отладки
-        #     self._push_to_web(message, 'debug')
-    
-    def log_warning(self, message, module='main'):
-        """Запись предупреждающего лога"""
-        logger = self.get_logger(module)
-        logger.warning(message)
-        self._push_to_web(message, 'warning')
-    
-    def log_error(self, message, module='error', exc_info=False):
-        """Запись лога об ошибке"""
-        logger = self.get_logger(module)
-        logger.error(message, exc_info=exc_info)
-        self._push_to_web(message, 'error')
-    
-    def log_critical(self, message, module='error', exc_info=False):
-        """Запись лога о критической ошибке"""
-        logger = self.get_logger(module)
-        logger.critical(message, exc_info=exc_info)
-        self._push_to_web(message, 'error')
+            push = self._web_push
+            while self._web_queue:
+                message, log_type = self._web_queue.popleft()
+                if push is None:
+                    continue
+                try:
+                    push(message, log_type)
+                except Exception:
+                    # Избегаем влияния сбоя рассылки логов на основную функциональность
+                    pass
+    
+    def _emit(self, level, default_module, push_type, message, module=None, exc_info=False):
+        """
+        Общая запись лога с рассылкой на Web фронтенд
+            push_type: Тип лога для фронтенда, None - не отправлять
+        """
+        module = module or default_module
+        logger = self._module_loggers.get(module) or self.get_logger(module)
+        web_push = self._web_push
+        enabled = logger.isEnabledFor(level)
+        if not enabled and (push_type is None or web_push is None):
+            return
+        
+        if enabled:
+            logger.log(level, message, exc_info=exc_info)
+        if push_type is not None and web_push is not None:
+            self._push_to_web(message, push_type)
     
     def log_ntrip_request(self, method, path, client_ip, user_agent=''):
         """Запись лога NTRIP запроса"""
-        message = f"NTRIP {method} request: {path} from {client_ip}"
+        logger = self.get_logger('ntrip')
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if user_agent:
-            message += f" (User-Agent: {user_agent})"
-        self.get_logger('ntrip').info(message)
+            logger.info("NTRIP %s request: %s from %s (User-Agent: %s)", method, path, client_ip, user_agent)
+        else:
+            logger.info("NTRIP %s request: %s from %s", method, path, client_ip)
     
     def log_ntrip_response(self, method, path, status_code, client_ip):
         """Запись лога NTRIP ответа"""
-        message = f"NTRIP {method} response: {status_code} for {path} to {client_ip}"
-        self.get_logger('ntrip').info(message)
+        self.get_logger('ntrip').info("NTRIP %s response: %s for %s to %s", method, status_code, path, client_ip)
     
     def log_client_connect(self, username, mount, client_ip, ntrip_version):
         """Запись лога подключения клиента"""
-        message = f"Client connected: {username}@{mount} from {client_ip} (NTRIP {ntrip_version})"
-        self.get_logger('ntrip').info(message)
+        self.get_logger('ntrip').info("Client connected: %s@%s from %s (NTRIP %s)", username, mount, client_ip, ntrip_version)
     
     def log_client_disconnect(self, username, mount, client_ip, reason=''):
         """Запись лога отключения клиента"""
-        message = f"Client disconnected: {username}@{mount} from {client_ip}"
+        logger = self.get_logger('ntrip')
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if reason:
-            message += f" (Reason: {reason})"
-        self.get_logger('ntrip').info(message)
+            logger.info("Client disconnected: %s@%s from %s (Reason: %s)", username, mount, client_ip, reason)
+        else:
+            logger.info("Client disconnected: %s@%s from %s", username, mount, client_ip)
     
     def log_data_transfer(self, mount, bytes_sent, client_count):
         """Запись лога передачи данных"""
-        message = f"Data transfer: {bytes_sent} bytes sent to {client_count} clients for mount {mount}"
-        self.get_logger('ntrip').debug(message)
+        logger = self.get_logger('ntrip')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Data transfer: %s bytes sent to %s clients for mount %s", bytes_sent, client_count, mount)
     
     def log_mount_operation(self, operation, mount, username='', details=''):
         """Запись лога операции с точкой монтирования"""
-        message = f"Mount {operation}: {mount}"
+        logger = self.get_logger('ntrip')
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        fmt, args = "Mount %s: %s", [operation, mount]
         if username:
-            message += f" by {username}"
+            fmt += " by %s"
+            args.append(username)
         if details:
-            message += f" ({details})"
-        self.get_logger('ntrip').info(message)
+            fmt += " (%s)"
+            args.append(details)
+        logger.info(fmt, *args)
     
     def log_authentication(self, username, mount, success, client_ip, reason=''):
         """Запись лога аутентификации"""
-        status = 'SUCCESS' if success else 'FAILED'
-        message = f"Authentication {status}: {username}@{mount} from {client_ip}"
-        if reason:
-            message += f" (Reason: {reason})"
-        
+        # Вызывается на каждой аутентификации: форматирование откладывается до фактической записи
         if success:
-            self.get_logger('ntrip').info(message)
+            logger, level, status = self.get_logger('ntrip'), logging.INFO, 'SUCCESS'
+        else:
+            logger, level, status = self.get_logger('error'), logging.WARNING, 'FAILED'
+
+        if not logger.isEnabledFor(level):
+            return
+
+        if reason:
+            logger.log(level, "Authentication %s: %s@%s from %s (Reason: %s)", status, username, mount, client_ip, reason)
         else:
-            self.get_logger('error').warning(message)
+            logger.log(level, "Authentication %s: %s@%s from %s", status, username, mount, client_ip)
     
     def log_system_event(self, event, details=''):
         """Запись лога системного события"""
-        message = f"System event: {event}"
+        logger = self.get_logger('main')
         if details:
-            message += f" - {details}"
-        self.get_logger('main').info(message)
-        self._push_to_web(f"Системное событие: {event}" + (f" - {details}" if details else ""), 'info')
+            logger.info("System event: %s - %s", event, details)
+        else:
+            logger.info("System event: %s", event)
+        
+        # Текст для фронтенда собирается только при подключенном Web
+        if self._web_push is not None:
+            if details:
+                self._push_to_web(f"Системное событие: {event} - {details}", 'info')
+            else:
+                self._push_to_web(f"Системное событие: {event}", 'info')
     
     def log_performance(self, metric, value, unit=''):
         """Запись лога показателей производительности"""
-        message = f"Performance: {metric} = {value}"
+        logger = self.get_logger('main')
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        # Единицы измерения передаются аргументом, поэтому символ '%' в них не требует экранирования
         if unit:
-            # Убеждаемся, что строка единиц измерения не будет неправильно интерпретирована как символ форматирования
-            safe_unit = str(unit).replace('%', '%%')
-            message += f" {safe_unit}"
-        self.get_logger('main').debug(message)
+            logger.debug("Performance: %s = %s %s", metric, value, unit)
+        else:
+            logger.debug("Performance: %s = %s", metric, value)
     
     def log_rtcm_data(self, mount, message_type, message_length, client_count):
         """Запись лога обработки данных RTCM"""
-        message = f"RTCM data: Type {message_type}, {message_length} bytes for mount {mount}, sent to {client_count} clients"
-        self.get_logger('ntrip').debug(message)
+        logger = self.get_logger('ntrip')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("RTCM data: Type %s, %s bytes for mount %s, sent to %s clients",
+                         message_type, message_length, mount, client_count)
     
     def log_database_operation(self, operation, table, success, details=''):
         """Запись лога операции с базой данных"""
-        status = 'SUCCESS' if success else 'FAILED'
-        message = f"Database {operation} {status}: {table}"
-        if details:
-            message += f" ({details})"
-        
         if success:
-            self.get_logger('main').debug(message)
+            logger, level, status = self.get_logger('main'), logging.DEBUG, 'SUCCESS'
+        else:
+            logger, level, status = self.get_logger('error'), logging.ERROR, 'FAILED'
+        
+        if not logger.isEnabledFor(level):
+            return
+        
+        if details:
+            logger.log(level, "Database %s %s: %s (%s)", operation, status, table, details)
         else:
-            self.get_logger('error').error(message)
+            logger.log(level, "Database %s %s: %s", operation, status, table)
     
     def log_web_request(self, method, path, client_ip, status_code, response_time=None):
         """Запись лога Web запроса"""
-        message = f"Web {method} {path} from {client_ip} - {status_code}"
+        logger = self.get_logger('main')
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if response_time is not None:
-            message += f" ({response_time:.3f}s)"
-        self.get_logger('main').info(message)
+            logger.info("Web %s %s from %s - %s (%.3fs)", method, path, client_ip, status_code, response_time)
+        else:
+            logger.info("Web %s %s from %s - %s", method, path, client_ip, status_code)
     
     def shutdown(self):
         """Завершение работы системы логирования"""
+        self._stop_listener()
+        
+        # Общие обработчики подключены к нескольким логгерам: каждый закрывается ровно один раз,
+        # закрытие (с финальной записью буфера на диск) выполняется параллельно
+        handlers = {}
         for logger in self._loggers.values():
-            for handler in logger.handlers:
-                handler.close()
+            for handler in logger.handlers[:]:
+                handlers[id(handler)] = handler
                 logger.removeHandler(handler)
+        for handler in self._handlers:
+            handlers[id(handler)] = handler
+        self._handlers.clear()
+        
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix='LogClose') as executor:
+            for handler in handlers.values():
+                executor.submit(handler.close)
         
         
         root_logger = logging.getLogger()
-        for handler in root_logger.handlers:
+        for handler in root_logger.handlers[:]:
             handler.close()
             root_logger.removeHandler(handler)
 
 
-_logger_instance = None
-_logger_lock = threading.Lock()
+# Система логирования настраивается один раз при импорте модуля
+_logger_instance = NTRIPLogger()
 
 def get_logger(name='root'):
     """Получение глобального экземпляра логгера"""
-    global _logger_instance
-    if _logger_instance is None:
-        with _logger_lock:
-            if _logger_instance is None:
-                _logger_instance = NTRIPLogger()
-    return _logger_instance.get_logger(name)
+    return (_logger_instance or init_logging()).get_logger(name)
 
 def init_logging():
     """Инициализация системы логирования"""
     global _logger_instance
     if _logger_instance is None:
-        with _logger_lock:
-            if _logger_instance is None:
-                _logger_instance = NTRIPLogger()
+        # Повторная настройка возможна только после shutdown_logging()
+        _logger_instance = NTRIPLogger()
     return _logger_instance
 
 def set_web_instance(web_instance):
@@ -346,88 +619,71 @@ def set_web_instance(web_instance):
 
 def log_info(message, module='main'):
     """Запись информационного лога"""
-    logger_instance = init_logging()
-    logger_instance.log_info(message, module)
+    (_logger_instance or init_logging()).log_info(message, module)
 
 def log_debug(message, module='main'):
     """Запись отладочного лога"""
-    logger_instance = init_logging()
-    logger_instance.log_debug(message, module)
+    (_logger_instance or init_logging()).log_debug(message, module)
 
 def log_warning(message, module='main'):
     """Запись предупреждающего лога"""
-    logger_instance = init_logging()
-    logger_instance.log_warning(message, module)
+    (_logger_instance or init_logging()).log_warning(message, module)
 
 def log_error(message, module='error', exc_info=False):
     """Запись лога об ошибке"""
-    logger_instance = init_logging()
-    logger_instance.log_error(message, module, exc_info)
+    (_logger_instance or init_logging()).log_error(message, module, exc_info)
 
 def log_critical(message, module='error', exc_info=False):
     """Запись лога о критической ошибке"""
-    logger_instance = init_logging()
-    logger_instance.log_critical(message, module, exc_info)
+    (_logger_instance or init_logging()).log_critical(message, module, exc_info)
 
 def log_ntrip_request(method, path, client_ip, user_agent=''):
     """Запись лога NTRIP запроса"""
-    logger_instance = init_logging()
-    logger_instance.log_ntrip_request(method, path, client_ip, user_agent)
+    (_logger_instance or init_logging()).log_ntrip_request(method, path, client_ip, user_agent)
 
 def log_ntrip_response(method, path, status_code, client_ip):
     """Запись лога NTRIP ответа"""
-    logger_instance = init_logging()
-    logger_instance.log_ntrip_response(method, path, status_code, client_ip)
+    (_logger_instance or init_logging()).log_ntrip_response(method, path, status_code, client_ip)
 
 def log_client_connect(username, mount, client_ip, ntrip_version):
     """Запись лога подключения клиента"""
-    logger_instance = init_logging()
-    logger_instance.log_client_connect(username, mount, client_ip, ntrip_version)
+    (_logger_instance or init_logging()).log_client_connect(username, mount, client_ip, ntrip_version)
 
 def log_client_disconnect(username, mount, client_ip, reason=''):
     """Запись лога отключения клиента"""
-    logger_instance = init_logging()
-    logger_instance.log_client_disconnect(username, mount, client_ip, reason)
+    (_logger_instance or init_logging()).log_client_disconnect(username, mount, client_ip, reason)
 
 def log_data_transfer(mount, bytes_sent, client_count):
     """Запись лога передачи данных"""
-    logger_instance = init_logging()
-    logger_instance.log_data_transfer(mount, bytes_sent, client_count)
+    (_logger_instance or init_logging()).log_data_transfer(mount, bytes_sent, client_count)
 
 def log_mount_operation(operation, mount, username='', details=''):
     """Запись лога операции с точкой монтирования"""
-    logger_instance = init_logging()
-    logger_instance.log_mount_operation(operation, mount, username, details)
+    (_logger_instance or init_logging()).log_mount_operation(operation, mount, username, details)
 
 def log_authentication(username, mount, success, client_ip, reason=''):
     """Запись лога аутентификации"""
-    logger_instance = init_logging()
-    logger_instance.log_authentication(username, mount, success, client_ip, reason)
+    (_logger_instance or init_logging()).log_authentication(username, mount, success, client_ip, reason)
 
 def log_system_event(event, details=''):
     """Запись лога системного события"""
-    logger_instance = init_logging()
-    logger_instance.log_system_event(event, details)
+    (_logger_instance or init_logging()).log_system_event(event, details)
 
 def log_performance(metric, value, unit=''):
     """Запись лога показателей производительности"""
-    logger_instance = init_logging()
-    logger_instance.log_performance(metric, value, unit)
+    (_logger_instance or init_logging()).log_performance(metric, value, unit)
 
 def log_rtcm_data(mount, message_type, message_length, client_count):
     """Запись лога обработки данных RTCM"""
-    logger_instance = init_logging()
-    logger_instance.log_rtcm_data(mount, message_type, message_length, client_count)
+    (_logger_instance or init_logging()).log_rtcm_data(mount, message_type, message_length, client_count)
 
 def log_database_operation(operation, table, success, details=''):
     """Запись лога операции с базой данных"""
-    logger_instance = init_logging()
-    logger_instance.log_database_operation(operation, table, success, details)
+    (_logger_instance or init_logging()).log_database_operation(operation, table, success, details)
 
 def log_web_request(method, path, client_ip, status_code, response_time=None):
     """Запись лога Web запроса"""
-    logger_instance = init_logging()
-    logger_instance.log_web_request(method, path, client_ip, status_code, response_time)
+    (_logger_instance or init_logging()).log_web_request(method, path, client_ip, status_code, response_time)
 
 def shutdown_logging():
     """Завершение работы системы логирования"""
@@ -5,18 +5,25 @@ ntrip.py - NTRIP Caster основной модуль
 проверка валидности пользователей и точек монтирования
 """
 
+import re
 import sys
 import time
 import socket
+import selectors
 import errno
+import heapq
+import itertools
 import logging
 import threading
 import base64
-from datetime import datetime, timezone
-from threading import Thread
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Queue, Full, Empty
-from collections import defaultdict
+import hashlib
+import hmac
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from collections import defaultdict, deque
+from functools import lru_cache
+from email.utils import formatdate
 
 from . import forwarder
 from . import config
@@ -32,26 +39,382 @@ WEB_PORT = config.WEB_PORT
 BUFFER_SIZE = config.BUFFER_SIZE
 
 
+def _split_source_url(url):
+    """Разобрать URL вида scheme://[user[:password]@]host[:port]/mount.
+    
+    Упрощенная замена urlparse для схем http, https и rtsp.
+    Возвращает (path, password, hostname, port); path всегда начинается с '/'.
+    """
+    rest = url.partition('://')[2]
+    slash = rest.find('/')
+    if slash < 0:
+        authority, path = rest, ''
+    else:
+        authority, path = rest[:slash], rest[slash:]
+    for stop in '?#;':
+        path = path.partition(stop)[0]
+    if not path.startswith('/'):
+        path = '/' + path
+    
+    userinfo, at, hostport = authority.rpartition('@')
+    password = None
+    if at:
+        username, colon, password = userinfo.partition(':')
+        if not (username and colon):
+            password = None
+    
+    if hostport.startswith('['):
+        # IPv6 адрес в квадратных скобках
+        host, _, port_part = hostport[1:].partition(']')
+        port_str = port_part[1:] if port_part.startswith(':') else ''
+    else:
+        host, _, port_str = hostport.partition(':')
+    
+    port = None
+    if port_str:
+        if not port_str.isdigit() or int(port_str) > 65535:
+            raise ValueError(f"Invalid port in URL: {port_str}")
+        port = int(port_str)
+    
+    return path, password, host.lower() or None, port
+
+
+@lru_cache(maxsize=4096)
+def _redact_request_line(first_line):
+    """Скрыть пароль в строке запроса NTRIP 1.0 (SOURCE password mount или GET mount password).
+    
+    Клиенты одной прошивки присылают одинаковые строки запроса, поэтому результат кэшируется.
+    """
+    parts = first_line.split()
+    if len(parts) >= 3:
+        method = parts[0]
+        if method == 'SOURCE':
+            if len(parts) > 3:
+                additional_info = ' '.join(parts[3:])
+                return f'{method} [PASSWORD_REDACTED] {parts[2]} {additional_info}'
+            return f'{method} [PASSWORD_REDACTED] {parts[2]}'
+        elif method == 'GET':
+            return f'{method} {parts[1]} [PASSWORD_REDACTED]'
+    return first_line
+
+
+def _redact_authorization(line):
+    """Заменить значение заголовка Authorization"""
+    line_lower = line.lower()
+    if 'basic' in line_lower:
+        return 'Authorization: Basic [REDACTED]'
+    elif 'digest' in line_lower:
+        return 'Authorization: Digest [REDACTED]'
+    return 'Authorization: [REDACTED]'
+
+
+def _decode_basic_credentials(auth_header):
+    """Декодировать значение заголовка 'Basic <base64>' в (username, password).
+    
+    Разделитель ищется в декодированных байтах, в строки преобразуются только имя и пароль.
+    Символы вне алфавита base64 не пропускаются молча, а считаются ошибкой.
+    Возвращает None, если разделителя нет; ValueError - при некорректном base64 или UTF-8.
+    """
+    raw = base64.b64decode(auth_header[6:].strip(), validate=True)
+    username, sep, password = raw.partition(b':')
+    if not sep:
+        return None
+    return username.decode('utf-8'), password.decode('utf-8')
+
+
+_md5 = hashlib.md5
+
+
+@lru_cache(maxsize=4096)
+def _compute_ha1(username, realm, password):
+    """HA1 для Digest: зависит только от (username, realm, password).
+    
+    Пароль входит в ключ кэша, поэтому после его смены старое значение просто не используется.
+    """
+    return _md5(f"{username}:{realm}:{password}".encode()).hexdigest()
+
+
+# Логгер модуля main: log_debug без явного модуля пишет в него
+_main_log = logger.get_logger('main')
+_ntrip_log = logger.get_logger('ntrip')
+_DEBUG_LOGGERS = {'main': _main_log, 'ntrip': _ntrip_log}
+
+
+def _debug(fmt, *args, module='main'):
+    """Debug лог с отложенным форматированием: строка собирается, только если уровень DEBUG включен"""
+    if _DEBUG_LOGGERS[module].isEnabledFor(logging.DEBUG):
+        logger.log_debug(fmt % args if args else fmt, module)
+
+
+def _info(fmt, *args, module='main'):
+    """Info лог с отложенным форматированием, для вызовов на каждом подключении"""
+    if _DEBUG_LOGGERS[module].isEnabledFor(logging.INFO):
+        logger.log_info(fmt % args if args else fmt, module)
+
+
+# Максимальный размер заголовков запроса, который дочитывается после первого фрагмента,
+# и время ожидания оставшейся части заголовков (секунды)
+MAX_REQUEST_HEADER_SIZE = 16 * 1024
+REQUEST_HEADER_WAIT = 1.0
+
+# Интервал, с которым поток наблюдения за подключениями для скачивания проверяет закрытые сокеты (секунды).
+# Разрыв со стороны клиента и закрытие сокета форвардером будят поток сразу
+DOWNLOAD_IDLE_CHECK_INTERVAL = 60
+# poll() не создает отдельный дескриптор (в отличие от epoll) и просыпается,
+# когда другой поток выполняет shutdown и close наблюдаемого сокета
+_WaitSelector = getattr(selectors, 'PollSelector', selectors.SelectSelector)
+
+# Буфер приема запроса на каждый рабочий поток, переиспользуется между подключениями
+_recv_local = threading.local()
+
+
+def _recv_buffer():
+    """Получить буфер приема текущего потока"""
+    buf = getattr(_recv_local, 'buf', None)
+    if buf is None:
+        buf = _recv_local.buf = bytearray(BUFFER_SIZE)
+    return buf
+
+
+def _find_header_end(buf, start, end):
+    """Позиция пустой строки, завершающей заголовки, или -1.
+    
+    Кроме CRLF учитываются запросы с голыми LF (старые клиенты NTRIP 1.0 и скрипты)
+    """
+    crlf = buf.find(b'\r\n\r\n', start, end)
+    lf = buf.find(b'\n\n', start, end)
+    if crlf < 0 or 0 <= lf < crlf:
+        return lf
+    return crlf
+
+
+def _send_buffer():
+    """Получить очищенный буфер заголовков ответа текущего потока.
+    
+    Выделенная память bytearray сохраняется после clear(), поэтому заголовки ответа
+    собираются без новых выделений памяти
+    """
+    out = getattr(_recv_local, 'out', None)
+    if out is None:
+        out = _recv_local.out = bytearray()
+    else:
+        out.clear()
+    return out
+
+
+# Параметры заголовка Digest: key="quoted" или key=token
+_DIGEST_PARAM_RE = re.compile(r'(\w+)=(?:"([^"]*)"|([^,\s]*))')
+
+# Все ключевые слова User-Agent за один проход регулярного выражения
+_UA_RE = re.compile(r'ntrip|rtk|gnss|gps|leica|trimble|2\.0', re.IGNORECASE)
+_NTRIP_UA_KEYWORDS = frozenset(('ntrip', 'rtk', 'gnss', 'gps'))
+_NTRIP2_UA_KEYWORDS = frozenset(('ntrip', 'rtk', 'gnss'))
+_OLD_CLIENTS = frozenset(('ntrip', 'rtk', 'gnss', 'leica', 'trimble'))
+# Без этих заголовков HTTP запрос считается запросом старого NTRIP клиента
+_REQUIRED_HTTP_HEADERS = ('connection', 'host')
+
+
+def _user_agent_hits(headers):
+    """Множество ключевых слов (в нижнем регистре), найденных в User-Agent"""
+    return frozenset(hit.lower() for hit in _UA_RE.findall(headers.get('user-agent', '')))
+
+
+# Параметры TCP Keep-Alive для каждого подключения; опции, отсутствующие на платформе,
+# отбрасываются один раз при импорте. При tune_per_socket = false устанавливается
+# только SO_KEEPALIVE, а интервалы берутся из настроек ядра
+_KEEPALIVE_OPTS = tuple(
+    (socket.IPPROTO_TCP, option, config.TCP_KEEPALIVE[key])
+    for option, key in (
+        (getattr(socket, 'TCP_KEEPIDLE', None), 'idle'),
+        (getattr(socket, 'TCP_KEEPINTVL', None), 'interval'),
+        (getattr(socket, 'TCP_KEEPCNT', None), 'count'),
+    )
+    if option is not None
+) if config.TCP_KEEPALIVE['tune_per_socket'] else ()
+
+
+# Типы протокола (NTRIPHandler.protocol_type); интернированные строки сравниваются по идентичности
+PT_NTRIP08 = sys.intern("ntrip0_8")
+PT_NTRIP10 = sys.intern("ntrip1_0")
+PT_NTRIP10_HTTP = sys.intern("ntrip1_0_http")
+PT_NTRIP20 = sys.intern("ntrip2_0")
+PT_RTSP = sys.intern("rtsp")
+PT_HTTP = sys.intern("http")
+
+# Нормализованные имена заголовков в том написании, в котором их присылают клиенты
+# ("User-Agent" -> "user-agent"); размер ограничен, чтобы произвольные имена не раздували кэш
+HEADER_NAMES_CACHE_MAX = 256
+_HEADER_NAMES = {}
+
+# Маршрутизация запросов в handle_request
+_UPLOAD_METHODS = frozenset(('SOURCE', 'POST'))
+# Схемы URL в строке запроса SOURCE (str.startswith с кортежем)
+_URL_SCHEMES = ('http://', 'https://', 'rtsp://')
+_SUPPORTED_METHODS = frozenset(('GET', 'POST', 'SOURCE', 'ADMIN', 'OPTIONS'))
+_RTSP_HANDLERS = {
+    'DESCRIBE': '_handle_rtsp_describe',
+    'SETUP': '_handle_rtsp_setup',
+    'PLAY': '_handle_rtsp_play',
+    'PAUSE': '_handle_rtsp_pause',
+    'TEARDOWN': '_handle_rtsp_teardown',
+    'RECORD': '_handle_rtsp_record',
+}
+_RTSP_METHODS = frozenset(_RTSP_HANDLERS)
+# Номера RTSP сессий: уникальны в пределах процесса, в отличие от секундной метки времени
+_rtsp_session_ids = itertools.count(1)
+_RTSP_TRANSPORT_TEMPLATE = 'Transport: RTP/AVP;unicast;client_port={};server_port=8002-8003'
+# SDP требует окончания строк CRLF
+_SDP_TEMPLATE = ('v=0\r\n'
+                 'o=- 0 0 IN IP4 {ip}\r\n'
+                 's=NTRIP Stream {mount}\r\n'
+                 'c=IN IP4 0.0.0.0\r\n'
+                 't=0 0\r\n'
+                 'm=application 0 RTP/AVP 96\r\n'
+                 'a=rtpmap:96 rtcm/1000\r\n'
+                 'a=control:*\r\n')
+_DOWNLOAD_PROTOCOLS = frozenset((PT_NTRIP10_HTTP, PT_NTRIP20, PT_NTRIP10, PT_NTRIP08))
+# Протоколы, для которых при отсутствии заголовка Host он добавляется автоматически
+_HOST_HEADER_PROTOCOLS = frozenset((PT_HTTP, PT_NTRIP20, PT_NTRIP10_HTTP))
+
+# Значение заголовка Date меняется раз в секунду: (секунда, значение в байтах)
+_date_cache = (0, b'')
+
+
+def _http_date():
+    """Текущая дата в формате RFC 1123 для заголовка Date (кэшируется на секунду)"""
+    global _date_cache
+    now = int(time.time())
+    cached = _date_cache
+    if cached[0] != now:
+        cached = _date_cache = (now, formatdate(now, usegmt=True).encode('ascii'))
+    return cached[1]
+
+
+# Строки CAS (информация о Caster) и NET (информация о сети) таблицы источников строятся
+# из конфигурации один раз. Переиспользуется существующая конфигурация: server_name=author,
+# server_port=NTRIP_PORT, operator=APP_NAME, network_name=author, website_url=APP_WEBSITE, fallback_ip=HOST
+_SOURCETABLE_HEAD = (
+    f"CAS;{config.APP_AUTHOR};{config.NTRIP_PORT};{config.APP_NAME};{config.APP_AUTHOR};0;{config.CASTER_COUNTRY};{config.CASTER_LATITUDE};{config.CASTER_LONGITUDE};{config.HOST};0;{config.APP_WEBSITE}\r\n"
+    f"NET;{config.APP_AUTHOR};{config.APP_AUTHOR};B;{config.CASTER_COUNTRY};{config.APP_WEBSITE};{config.APP_WEBSITE};{config.APP_CONTACT};none\r\n"
+).encode('utf-8')
+_SOURCETABLE_SERVER_HEADER = f"Server: NTRIP 2RTK caster {config.APP_VERSION}\r\n".encode('utf-8')
+
+# Постоянные короткие ответы
+_ICY_200_OK = b"ICY 200 OK\r\n\r\n"
+_ICY_200_OK_CLOSE = b"ICY 200 OK\r\nConnection: close\r\n\r\n"
+# Заголовки запроса аутентификации: меняется только nonce
+_AUTH_BASIC = b'WWW-Authenticate: Basic realm="NTRIP"\r\n'
+_AUTH_DIGEST_PREFIX = b'WWW-Authenticate: Digest realm="NTRIP", nonce="'
+_AUTH_DIGEST_SUFFIX = b'", algorithm=MD5, qop="auth"\r\n'
+
+# sendmsg отправляет несколько буферов одной записью (нет на Windows)
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
+# Неизменяемые части заголовков ответа, заранее закодированные
+_NTRIP2_RESPONSE_HEADERS = (b"Ntrip-Version: NTRIP/2.0\r\n"
+                            b"Cache-Control: no-cache, no-store, must-revalidate\r\n"
+                            b"Pragma: no-cache\r\n"
+                            b"Expires: 0\r\n")
+_NTRIP2_VERSION_HEADER = b"Ntrip-Version: NTRIP/2.0\r\n"
+_SERVER_HEADER = f"Server: {config.APP_NAME}/{config.VERSION}\r\n".encode('utf-8')
+_SECURITY_HEADERS = b"X-Content-Type-Options: nosniff\r\nX-Frame-Options: DENY\r\n"
+
+# Текст статуса для ответов об ошибке в формате NTRIP 2.0
+_HTTP_STATUS_MESSAGES = {
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    500: "Internal Server Error"
+}
+
+# Префикс имени пользователя при аутентификации только паролем точки монтирования
+_URL_PASSWORD_USER_PREFIX = {
+    PT_NTRIP10: 'source_',
+    PT_NTRIP10_HTTP: 'http_',
+    PT_NTRIP08: 'ntrip08_',
+    PT_NTRIP20: 'ntrip20_',
+    PT_RTSP: 'rtsp_',
+}
+# Протоколы, в которых пароль из URL принимается, только если заголовка Authorization нет
+_URL_PASSWORD_WITHOUT_HEADER_ONLY = frozenset((PT_NTRIP20, PT_RTSP))
+# Ответ при отсутствии пригодных учетных данных
+_MISSING_AUTH_MESSAGES = {
+    PT_NTRIP10: "Authentication required",
+    PT_NTRIP10_HTTP: "Missing authorization",
+    PT_NTRIP08: "Authentication required",
+    PT_NTRIP20: "Invalid authorization format",
+    PT_RTSP: "Invalid authorization format",
+}
+# Обработчики схем заголовка Authorization (имя схемы в нижнем регистре)
+_AUTH_SCHEME_HANDLERS = {
+    'basic': '_verify_basic_auth',
+    'digest': '_verify_digest_auth',
+}
+
+
+ANTI_SPAM_SHARDS = 64  # число полос блокировок, степень двойки
+
+
+class _RingCounter:
+    """Счетчик записанных сообщений по секундным ячейкам в пределах окна"""
+    __slots__ = ('slots', 'total', 'last_second')
+    
+    def __init__(self, window):
+        # array('I'), а не bytearray: значение ячейки ограничено max_count, который может быть больше 255
+        self.slots = array('I', [0]) * window
+        self.total = 0
+        self.last_second = 0
+    
+    def advance(self, now_second):
+        """Обнулить ячейки, вышедшие из окна с момента последнего обращения"""
+        window = len(self.slots)
+        elapsed = now_second - self.last_second
+        if elapsed >= window:
+            if self.total:
+                self.slots = array('I', [0]) * window
+                self.total = 0
+        else:
+            for second in range(self.last_second + 1, now_second + 1):
+                index = second % window
+                self.total -= self.slots[index]
+                self.slots[index] = 0
+        self.last_second = now_second
+
+
 class AntiSpamLogger:
+    __slots__ = ('time_window', 'max_count', '_locks', 'message_counts', 'suppressed_counts', '_flush_thread')
+    
     def __init__(self, time_window=60, max_count=5):
         self.time_window = time_window  
         self.max_count = max_count      
-        self.message_counts = defaultdict(list)  
+        # Полосатые блокировки: ключи разных сообщений не конкурируют за один Lock
+        self._locks = [threading.Lock() for _ in range(ANTI_SPAM_SHARDS)]
+        # Окно хранится кольцом секундных ячеек: учитываются только записанные сообщения,
+        # поэтому значение ячейки не превышает max_count
+        window = max(1, int(time_window))
+        self.message_counts = defaultdict(lambda: _RingCounter(window))
         self.suppressed_counts = defaultdict(int)  
-        self.lock = threading.Lock()
+        
+        # Итоги подавления выводятся фоновым потоком раз в окно, а не в месте вызова
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='AntiSpamFlush', daemon=True)
+        self._flush_thread.start()
+    
+    def _lock_for(self, message_key):
+        return self._locks[hash(message_key) & (ANTI_SPAM_SHARDS - 1)]
     
     def should_log(self, message_key):
         """Проверить, следует ли записывать лог"""
-        with self.lock:
-            now = time.time()
-
-            self.message_counts[message_key] = [
-                timestamp for timestamp in self.message_counts[message_key]
-                if now - timestamp < self.time_window
-            ]
-            
-            if len(self.message_counts[message_key]) < self.max_count:
-                self.message_counts[message_key].append(now)
+        with self._lock_for(message_key):
+            ring = self.message_counts[message_key]
+            now_second = int(time.monotonic())
+            if now_second != ring.last_second:
+                ring.advance(now_second)
+            
+            if ring.total < self.max_count:
+                ring.slots[now_second % len(ring.slots)] += 1
+                ring.total += 1
                 return True
             else:
                 self.suppressed_counts[message_key] += 1
@@ -59,37 +422,254 @@ class AntiSpamLogger:
     
     def get_suppressed_count(self, message_key):
         """Получить количество подавленных сообщений"""
-        with self.lock:
-            count = self.suppressed_counts[message_key]
-            self.suppressed_counts[message_key] = 0  
-            return count
+        with self._lock_for(message_key):
+            return self.suppressed_counts.pop(message_key, 0)
+    
+    def _take_suppressed_counts(self):
+        """Забрать все счетчики подавленных сообщений, заменив их пустыми"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            counts, self.suppressed_counts = self.suppressed_counts, defaultdict(int)
+        finally:
+            for lock in self._locks:
+                lock.release()
+        return counts
+    
+    def _flush_loop(self):
+        """Периодически записывать сводку подавленных сообщений"""
+        while True:
+            time.sleep(self.time_window)
+            try:
+                counts = self._take_suppressed_counts()
+                if counts:
+                    logger.log_debug(f"Подавлено {sum(counts.values())} повторяющихся сообщений по {len(counts)} ключам", 'ntrip')
+            except Exception:
+                # Сбой сводки не должен останавливать поток
+                pass
 
 anti_spam_logger = AntiSpamLogger(time_window=60, max_count=3)
+
+
+class _DelayedCalls:
+    """Отложенные вызовы, выполняемые одним фоновым потоком (вместо threading.Timer на каждый вызов)"""
+    __slots__ = ('_heap', '_counter', '_cond', '_thread')
+    
+    def __init__(self):
+        self._heap = []  # (срок, порядковый номер, функция)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+    
+    def schedule(self, delay, func):
+        """Выполнить func() не раньше чем через delay секунд"""
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), func))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='DelayedCalls', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._heap:
+                        wait = self._heap[0][0] - time.monotonic()
+                        if wait <= 0:
+                            func = heapq.heappop(self._heap)[2]
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            try:
+                func()
+            except Exception as e:
+                logger.log_error(f"Ошибка отложенного вызова: {e}", exc_info=True)
+
+_delayed_calls = _DelayedCalls()
+
+
+class _DownloadWatcher:
+    """Наблюдение за подключениями для скачивания одним фоновым потоком.
+    
+    После ответа клиенту рабочий поток пула освобождается, а сокет переходит сюда:
+    присланные клиентом данные (например, NMEA GGA) читаются и отбрасываются,
+    при разрыве или закрытии сокета форвардером вызывается on_close().
+    """
+    __slots__ = ('_selector', '_lock', '_added', '_wakeup_r', '_wakeup_w', '_thread')
+    
+    def __init__(self):
+        self._selector = None
+        self._lock = threading.Lock()
+        self._added = []  # (сокет, on_close), ожидающие регистрации в селекторе
+        self._wakeup_r = self._wakeup_w = None
+        self._thread = None
+    
+    def watch(self, client_socket, on_close):
+        """Наблюдать за сокетом до разрыва подключения"""
+        with self._lock:
+            if self._thread is None:
+                self._selector = _WaitSelector()
+                self._wakeup_r, self._wakeup_w = socket.socketpair()
+                self._wakeup_r.setblocking(False)
+                self._wakeup_w.setblocking(False)
+                self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+                thread = threading.Thread(target=self._run, name='DownloadWatcher', daemon=True)
+                thread.start()
+                self._thread = thread
+            # Сокет ставится в очередь только после успешного запуска потока:
+            # если watch() завершился ошибкой, on_close для сокета вызван не будет
+            self._added.append((client_socket, on_close))
+        try:
+            self._wakeup_w.send(b'\0')
+        except OSError:
+            # Буфер пробуждения уже заполнен - поток и так проснется
+            pass
+    
+    def _run(self):
+        buf = _recv_buffer()
+        next_check = time.monotonic() + DOWNLOAD_IDLE_CHECK_INTERVAL
+        while True:
+            # Ошибка одной итерации не должна останавливать единственный поток наблюдения:
+            # иначе слоты подключений и клиенты форвардера не освобождались бы до перезапуска
+            try:
+                for key, _ in self._selector.select(DOWNLOAD_IDLE_CHECK_INTERVAL):
+                    if key.fileobj is self._wakeup_r:
+                        self._register_added(buf)
+                        continue
+                    try:
+                        received = key.fileobj.recv_into(buf)
+                    except (BlockingIOError, InterruptedError):
+                        continue
+                    except OSError:
+                        received = 0
+                    if not received:
+                        self._drop(key)
+                
+                now = time.monotonic()
+                if now >= next_check:
+                    next_check = now + DOWNLOAD_IDLE_CHECK_INTERVAL
+                    self._drop_closed()
+            except OSError as e:
+                # SelectSelector (Windows) завершается ошибкой, если наблюдаемый сокет закрыт
+                log_error(f"Ошибка ожидания событий подключений для скачивания: {e}", exc_info=True)
+                self._drop_closed()
+            except Exception as e:
+                log_error(f"Ошибка в потоке наблюдения за подключениями для скачивания: {e}", exc_info=True)
+    
+    def _drop_closed(self):
+        """Завершить подключения, сокеты которых уже закрыты (например, форвардером)"""
+        for key in list(self._selector.get_map().values()):
+            if key.fileobj is not self._wakeup_r and key.fileobj.fileno() == -1:
+                self._drop(key)
+    
+    def _register_added(self, buf):
+        try:
+            while self._wakeup_r.recv_into(buf):
+                pass
+        except OSError:
+            pass
+        with self._lock:
+            added, self._added = self._added, []
+        # Каждый сокет регистрируется отдельно: ошибка одного не должна оставить
+        # остальные без наблюдения (их on_close иначе никогда не был бы вызван)
+        for client_socket, on_close in added:
+            try:
+                try:
+                    self._selector.register(client_socket, selectors.EVENT_READ, on_close)
+                except KeyError:
+                    # Дескриптор переиспользован: прежний сокет уже закрыт, но его ключ еще в селекторе
+                    self._drop(self._selector.get_key(client_socket.fileno()))
+                    self._selector.register(client_socket, selectors.EVENT_READ, on_close)
+            except (ValueError, OSError):
+                # Сокет закрыт до регистрации
+                self._call(on_close)
+            except Exception as e:
+                logger.log_error(f"Не удалось начать наблюдение за подключением для скачивания: {e}", exc_info=True)
+                self._call(on_close)
+    
+    def _drop(self, key):
+        try:
+            self._selector.unregister(key.fileobj)
+        except (KeyError, ValueError):
+            pass
+        self._call(key.data)
+    
+    @staticmethod
+    def _call(on_close):
+        try:
+            on_close()
+        except Exception as e:
+            logger.log_error(f"Ошибка при закрытии подключения для скачивания: {e}", exc_info=True)
+
+_download_watcher = _DownloadWatcher()
 MAX_CONNECTIONS = config.MAX_CONNECTIONS
 MAX_CONNECTIONS_PER_USER = config.MAX_CONNECTIONS_PER_USER
 MAX_WORKERS = config.MAX_WORKERS
 CONNECTION_QUEUE_SIZE = config.CONNECTION_QUEUE_SIZE
+USER_CONNECTION_LIMIT_MESSAGE = f"User connection limit exceeded (max: {MAX_CONNECTIONS_PER_USER})"
+
+
+def _user_connection_limit_reached(username):
+    """Проверить лимит подключений пользователя.
+    
+    Счетчик читается без блокировки: ConnectionManager изменяет его под user_lock,
+    а чтение одного значения из dict атомарно
+    """
+    return connection.get_user_connection_count(username) >= MAX_CONNECTIONS_PER_USER
 
 # Получить логгер
 
 class NTRIPHandler:
     """Обработчик NTRIP запросов"""
     
-    def __init__(self, client_socket, client_address, db_manager):
+    # Экземпляр создается на каждое подключение. parsed_host и parsed_port задаются не всегда:
+    # hasattr() для незаданного слота возвращает False
+    __slots__ = ('client_socket', 'client_address', 'db_manager', 'ntrip_version', 'protocol_type',
+                 'user_agent', 'mount', 'username', 'ntrip1_password', 'current_method',
+                 'parsed_host', 'parsed_port', 'client_info', 'mount_connection_established',
+                 'detached', 'on_detached_close')
+    
+    def __init__(self, client_socket, client_address, db_manager, on_detached_close=None):
         self.client_socket = client_socket
         self.client_address = client_address
         self.db_manager = db_manager
         self.ntrip_version = "1.0"
-        self.protocol_type = "ntrip1_0"
+        self.protocol_type = PT_NTRIP10
         self.user_agent = ""
         self.mount = ""
         self.username = ""
         self.ntrip1_password = ""  
         self.current_method = "GET"  
+        self.client_info = None  # задается только для подключения для скачивания
+        self.mount_connection_established = False
+        # Подключение для скачивания передано _download_watcher: сокет закроет он,
+        # после чего вызовет on_detached_close
+        self.detached = False
+        self.on_detached_close = on_detached_close
         
         self.client_socket.settimeout(config.SOCKET_TIMEOUT)
         
         self._configure_keepalive()
+        
+        if config.TCP_NODELAY:
+            try:
+                self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError as e:
+                _debug("Не удалось включить TCP_NODELAY: %s", e, module='ntrip')
+        
+        self._apply_buffer_overrides()
+    
+    def _apply_buffer_overrides(self):
+        """Задать размеры буферов сокета, только если они явно указаны в конфигурации"""
+        try:
+            if config.TCP_SNDBUF_OVERRIDE:
+                self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.TCP_SNDBUF_OVERRIDE)
+            if config.TCP_RCVBUF_OVERRIDE:
+                self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, config.TCP_RCVBUF_OVERRIDE)
+        except OSError as e:
+            logger.log_warning(f"Ошибка при настройке буферов сокета: {e}", 'ntrip')
     
     def _configure_keepalive(self):
         """Настроить TCP Keep-Alive (кроссплатформенная реализация)"""
@@ -101,42 +681,43 @@ class NTRIPHandler:
             self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             
             try:
-                if hasattr(socket, 'TCP_KEEPIDLE'):
-                    self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, config.TCP_KEEPALIVE['idle'])
-                if hasattr(socket, 'TCP_KEEPINTVL'):
-                    self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, config.TCP_KEEPALIVE['interval'])
-                if hasattr(socket, 'TCP_KEEPCNT'):
-                    self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, config.TCP_KEEPALIVE['count'])
-                
-                message_key = "tcp_keepalive_configured"
-                if anti_spam_logger.should_log(message_key):
-                    suppressed = anti_spam_logger.get_suppressed_count(message_key)
-                    if suppressed > 0:
-                        logger.log_debug(f"TCP Keep-Alive настроен: idle={config.TCP_KEEPALIVE['idle']}s (подавлено {suppressed} похожих сообщений)", 'ntrip')
-                    else:
-                        logger.log_debug(f"TCP Keep-Alive настроен: idle={config.TCP_KEEPALIVE['idle']}s", 'ntrip')
+                for level, option, value in _KEEPALIVE_OPTS:
+                    self.client_socket.setsockopt(level, option, value)
             except OSError:
 
                 logger.log_debug("TCP Keep-Alive включен (используются системные параметры по умолчанию)", 'ntrip')
         except Exception as e:
-            logger.log_debug(f"Настройка Keep-Alive не удалась: {e}", 'ntrip')
+            _debug("Настройка Keep-Alive не удалась: %s", e, module='ntrip')
     
     def handle_request(self):
         """Обработать NTRIP запрос с улучшенной валидацией и обработкой ошибок"""
         try:
             # Изменено на уровень debug, чтобы избежать частых логов
-            log_debug(f"=== Начало обработки запроса {self.client_address} ===")
+            _debug("=== Начало обработки запроса %s ===", self.client_address)
 
-            request_data = self.client_socket.recv(BUFFER_SIZE).decode('utf-8', errors='ignore')
-            if not request_data:
-                log_debug(f"Клиент {self.client_address} отправил пустой запрос")
+            buf = _recv_buffer()
+            received = self.client_socket.recv_into(buf)
+            if not received:
+                _debug("Клиент %s отправил пустой запрос", self.client_address)
                 return
             
-            raw_request = request_data[:200]
-            sanitized_request = self._sanitize_request_for_logging(raw_request)
-
-            # Изменено на уровень debug, чтобы избежать частых логов
-            log_debug(f"Обнаружен запрос на подключение от {self.client_address}: {sanitized_request}")
+            # Декодируем только строку запроса и заголовки: данные после пустой строки
+            # (например, RTCM поток источника) не разбираются
+            header_end = _find_header_end(buf, 0, received)
+            if header_end < 0 and received < MAX_REQUEST_HEADER_SIZE:
+                # Заголовки пришли не целиком (фрагментация на медленных каналах)
+                received = self._recv_header_rest(buf, received)
+                header_end = _find_header_end(buf, 0, received)
+            if header_end < 0:
+                header_end = received
+            with memoryview(buf) as view:
+                request_data = str(view[:header_end], 'utf-8', 'ignore')
+            
+            # Изменено на уровень debug, чтобы избежать частых логов;
+            # очистка запроса выполняется, только если debug лог действительно пишется
+            if _main_log.isEnabledFor(logging.DEBUG):
+                sanitized_request = self._sanitize_request_for_logging(request_data[:200])
+                log_debug(f"Обнаружен запрос на подключение от {self.client_address}: {sanitized_request}")
             
             lines = request_data.strip().split('\r\n')
             if not lines or not lines[0].strip():
@@ -144,26 +725,29 @@ class NTRIPHandler:
                 return
             
             request_line = lines[0]
+            # Строка запроса разбивается один раз, части используются при разборе и определении версии
+            request_parts = request_line.split()
             try:
-                method, path, protocol = self._parse_request_line(request_line)
+                method, path, protocol = self._parse_request_line(request_line, request_parts)
 
-                self.current_method = method.upper()
+                # _parse_request_line уже возвращает метод в верхнем регистре
+                self.current_method = method
             except ValueError as e:
-                log_debug(f"Не удалось распарсить строку запроса {self.client_address}: {e}")
+                _debug("Не удалось распарсить строку запроса %s: %s", self.client_address, e)
                 self.send_error_response(400, f"Bad Request: {str(e)}")
                 return
             
             headers = self._parse_headers(lines[1:])
             
             if self._is_empty_request(method, path, headers):
-                log_debug(f"Обнаружен пустой запрос {self.client_address}")
+                _debug("Обнаружен пустой запрос %s", self.client_address)
                 self.send_error_response(400, "Bad Request: Empty request")
                 return
             
-            self._determine_ntrip_version(headers, request_line)
+            self._determine_ntrip_version(headers, request_line, request_parts)
             
             # Для отладки: логируем определенный протокол
-            log_debug(f"Определен протокол для {self.client_address}: {self.protocol_type} (версия: {self.ntrip_version}), метод: {method}, путь: {path}")
+            _debug("Определен протокол для %s: %s (версия: %s), метод: %s, путь: %s", self.client_address, self.protocol_type, self.ntrip_version, method, path)
             
             is_valid, error_msg = self._is_valid_request(method, path, headers)
             if not is_valid:
@@ -175,34 +759,34 @@ class NTRIPHandler:
             self.user_agent = headers.get('user-agent', 'Unknown')
             
             # Изменено на уровень debug, чтобы избежать частых логов
-            log_debug(f"Проверка запроса пройдена {self.client_address}: {method} {path} (протокол: {self.protocol_type})")
+            _debug("Проверка запроса пройдена %s: %s %s (протокол: %s)", self.client_address, method, path, self.protocol_type)
 
-            if method.upper() in ['SOURCE', 'POST']:
+            if method in _UPLOAD_METHODS:
                 # Обработка загрузки данных
                 self.handle_upload(path, headers)
-            elif method.upper() == 'GET':
+            elif method == 'GET':
                 # Обработка скачивания данных
-                if self.protocol_type in ['ntrip1_0_http', 'ntrip2_0', 'ntrip1_0', 'ntrip0_8']:
+                if self.protocol_type in _DOWNLOAD_PROTOCOLS:
                     self.handle_download(path, headers)
                 else:
                     # Обработка обычного HTTP GET
                     self.handle_http_get(path, headers)
 
-            elif method.upper() == 'OPTIONS':
+            elif method == 'OPTIONS':
                 # Обработка OPTIONS запроса
                 self.handle_options(headers)
-            elif method.upper() in ['DESCRIBE', 'SETUP', 'PLAY', 'PAUSE', 'TEARDOWN', 'RECORD']:
+            elif method in _RTSP_METHODS:
                 # Обработка RTSP команд
                 self.handle_rtsp_command(method, path, headers)
             else:
                 self.send_error_response(405, f"Method Not Allowed: {method}")
         
         except socket.timeout:
-            log_debug(f"Клиент {self.client_address} - таймаут подключения")
+            _debug("Клиент %s - таймаут подключения", self.client_address)
             
             self._cleanup()
         except UnicodeDecodeError as e:
-            log_debug(f"Не удалось декодировать запрос {self.client_address}: {e}")
+            _debug("Не удалось декодировать запрос %s: %s", self.client_address, e)
             self.send_error_response(400, "Bad Request: Invalid encoding")
             # Очистка ресурсов
             self._cleanup()
@@ -212,9 +796,38 @@ class NTRIPHandler:
 
             self._cleanup()
     
-    def _parse_request_line(self, request_line):
-        """Распарсить строку запроса, поддерживает различные форматы SOURCE для разных версий NTRIP"""
-        parts = request_line.split()
+    def _recv_header_rest(self, buf, received):
+        """Дочитать заголовки запроса до пустой строки.
+        
+        Ожидание ограничено REQUEST_HEADER_WAIT секундами и MAX_REQUEST_HEADER_SIZE байтами;
+        если конец заголовков так и не пришел, разбирается то, что получено.
+        Возвращает общее количество байт в буфере.
+        """
+        limit = min(MAX_REQUEST_HEADER_SIZE, len(buf))
+        deadline = time.monotonic() + REQUEST_HEADER_WAIT
+        try:
+            with memoryview(buf) as view:
+                while received < limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.client_socket.settimeout(remaining)
+                    count = self.client_socket.recv_into(view[received:limit])
+                    if not count:
+                        break
+                    # Разделитель мог оказаться на границе фрагментов
+                    search_from = max(0, received - 3)
+                    received += count
+                    if _find_header_end(buf, search_from, received) >= 0:
+                        break
+        except socket.timeout:
+            pass
+        finally:
+            self.client_socket.settimeout(config.SOCKET_TIMEOUT)
+        return received
+    
+    def _parse_request_line(self, request_line, parts):
+        """Распарсить строку запроса (parts - request_line.split()), поддерживает различные форматы SOURCE для разных версий NTRIP"""
         
         if not parts:
             raise ValueError("Empty request line")
@@ -226,7 +839,8 @@ class NTRIPHandler:
                 if len(parts) == 2:
                     # NTRIP 0.8 формат: "SOURCE <url>" или "SOURCE <path>"
                     url_or_path = parts[1]
-                    if url_or_path.startswith('/') and not url_or_path.startswith(('http://', 'https://', 'rtsp://')):
+                    # Путь, начинающийся с /, не может одновременно начинаться со схемы URL
+                    if url_or_path.startswith('/'):
                         # SOURCE /mountpoint без пароля, требуется последующая 401 аутентификация
                         return 'SOURCE', url_or_path, 'NTRIP/1.0'
                     else:
@@ -236,7 +850,7 @@ class NTRIPHandler:
                     mountpoint_or_url = parts[2]
                     
                     # Проверить, является ли это URL
-                    if mountpoint_or_url.startswith(('http://', 'https://', 'rtsp://')):
+                    if mountpoint_or_url.startswith(_URL_SCHEMES):
                         # NTRIP 0.8 URL формат: "SOURCE <password> <url>"
                         return self._parse_source_url_format(mountpoint_or_url, password)
                     else:
@@ -263,7 +877,7 @@ class NTRIPHandler:
         
         # Стандартный HTTP формат: "METHOD PATH PROTOCOL"
         elif len(parts) == 3:
-            method, path, protocol = parts
+            _, path, protocol = parts
             
             # Для RTSP протокола сохранить оригинальный URL формат
             if protocol.startswith('RTSP/'):
@@ -280,54 +894,21 @@ class NTRIPHandler:
     
     def _parse_source_url_format(self, url, password=None):
         """Распарсить URL формат в SOURCE запросе"""
-        from urllib.parse import urlparse
-        
-        if url.startswith(('http://', 'https://')):
-            parsed = urlparse(url)
-            
-            mountpoint = parsed.path
+        if url.startswith(_URL_SCHEMES):
+            mountpoint, url_password, hostname, port = _split_source_url(url)
             if not mountpoint or mountpoint == '/':
-                raise ValueError(f"Invalid mountpoint in URL: {url}")
-
-            if not mountpoint.startswith('/'):
-                mountpoint = '/' + mountpoint
+                kind = "RTSP URL" if url.startswith('rtsp://') else "URL"
+                raise ValueError(f"Invalid mountpoint in {kind}: {url}")
 
-            if parsed.username and parsed.password:
-
-                self.ntrip1_password = parsed.password
-            elif password:
-                self.ntrip1_password = password
-            
-            if parsed.hostname:
-                self.parsed_host = parsed.hostname
-            if parsed.port:
-                self.parsed_port = parsed.port
-            
-            return 'SOURCE', mountpoint, 'NTRIP/0.8'
-        
-        elif url.startswith('rtsp://'):
-            
-            parsed = urlparse(url)
-            
-            
-            mountpoint = parsed.path
-            if not mountpoint or mountpoint == '/':
-                raise ValueError(f"Invalid mountpoint in RTSP URL: {url}")
-            
-            
-            if not mountpoint.startswith('/'):
-                mountpoint = '/' + mountpoint
-            
-            
-            if parsed.username and parsed.password:
-                self.ntrip1_password = parsed.password
+            if url_password:
+                self.ntrip1_password = url_password
             elif password:
                 self.ntrip1_password = password
             
-            if parsed.hostname:
-                self.parsed_host = parsed.hostname
-            if parsed.port:
-                self.parsed_port = parsed.port
+            if hostname:
+                self.parsed_host = hostname
+            if port:
+                self.parsed_port = port
             
             return 'SOURCE', mountpoint, 'NTRIP/0.8'
         
@@ -348,75 +929,67 @@ class NTRIPHandler:
         """Распарсить заголовки запроса"""
         headers = {}
         for line in header_lines:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                headers[key.strip().lower()] = value.strip()
+            key, sep, value = line.partition(':')
+            if sep:
+                name = _HEADER_NAMES.get(key)
+                if name is None:
+                    name = key.strip().lower()
+                    if len(_HEADER_NAMES) < HEADER_NAMES_CACHE_MAX:
+                        _HEADER_NAMES[key] = sys.intern(name)
+                headers[name] = value.strip()
         return headers
     
-    def _determine_ntrip_version(self, headers, request_line):
-        """Определить тип NTRIP протокола"""
+    def _determine_ntrip_version(self, headers, request_line, parts):
+        """Определить тип NTRIP протокола (parts - request_line.split())"""
         
         if request_line.startswith(('SOURCE ', 'ADMIN ')):
             # Обработка SOURCE и ADMIN запросов
-            parts = request_line.split()
             if len(parts) >= 2:
 
                 second_param = parts[1] if len(parts) == 2 else parts[2] if len(parts) >= 3 else ""
-                if (second_param.startswith(('http://', 'https://', 'rtsp://')) or 
-                    (len(parts) == 2 and (second_param.startswith('/') or not second_param.startswith('http')))):
+                # Путь с / не начинается с 'http', поэтому отдельная проверка '/' не нужна
+                if second_param.startswith(_URL_SCHEMES) or (len(parts) == 2 and not second_param.startswith('http')):
                     self.ntrip_version = "0.8"
-                    self.protocol_type = "ntrip0_8"
+                    self.protocol_type = PT_NTRIP08
                     
-                    message_key = f"ntrip_08_request_{self.client_address[0]}"
-                    if anti_spam_logger.should_log(message_key):
-                        suppressed = anti_spam_logger.get_suppressed_count(message_key)
-                        if suppressed > 0:
-                            logger.log_debug(f"Обнаружен NTRIP 0.8 запрос: {request_line.split()[0]} - {self.client_address} (подавлено {suppressed} похожих сообщений)", 'ntrip')
-                        else:
-                            logger.log_debug(f"Обнаружен NTRIP 0.8 запрос: {request_line.split()[0]} - {self.client_address}", 'ntrip')
+                    self._log_ntrip1_request("0.8", "ntrip_08_request", parts[0])
                     return
             
             # Определить как NTRIP 1.0
             self.ntrip_version = "1.0"
-            self.protocol_type = "ntrip1_0"
+            self.protocol_type = PT_NTRIP10
             
-            message_key = f"ntrip_10_request_{self.client_address[0]}"
-            if anti_spam_logger.should_log(message_key):
-                suppressed = anti_spam_logger.get_suppressed_count(message_key)
-                if suppressed > 0:
-                    logger.log_debug(f"Обнаружен NTRIP 1.0 запрос: {request_line.split()[0]} - {self.client_address} (подавлено {suppressed} похожих сообщений)", 'ntrip')
-                else:
-                    logger.log_debug(f"Обнаружен NTRIP 1.0 запрос: {request_line.split()[0]} - {self.client_address}", 'ntrip')
+            self._log_ntrip1_request("1.0", "ntrip_10_request", parts[0])
             return
         
         
         # Определить тип протокола из строки запроса
         if 'HTTP/' in request_line:
-            protocol_type = "http"
+            protocol_type = PT_HTTP
         elif 'RTSP/' in request_line:
-            protocol_type = "rtsp"
+            protocol_type = PT_RTSP
             self.ntrip_version = "1.0"
-            self.protocol_type = "rtsp"
-            logger.log_debug(f"Обнаружен RTSP протокол: {self.client_address}", 'ntrip')
+            self.protocol_type = PT_RTSP
+            _debug("Обнаружен RTSP протокол: %s", self.client_address, module='ntrip')
             return
         else:
             protocol_type = "unknown"
         
+        ua_hits = _user_agent_hits(headers)
+        
         # Обработка HTTP запросов (POST, GET)
         if request_line.startswith(('POST ', 'GET ')) and 'HTTP/' in request_line:
-            user_agent = headers.get('user-agent', '').lower()
-            
             # Проверить User-Agent на наличие NTRIP клиентов
-            if any(ntrip_ua in user_agent for ntrip_ua in ['ntrip', 'rtk', 'gnss', 'gps']):
+            if ua_hits & _NTRIP_UA_KEYWORDS:
                 # Определить версию по User-Agent или версии HTTP
-                if '2.0' in user_agent or 'HTTP/1.1' in request_line:
+                if '2.0' in ua_hits or 'HTTP/1.1' in request_line:
                     self.ntrip_version = "2.0"
-                    self.protocol_type = "ntrip2_0"
-                    logger.log_debug(f"Обнаружен NTRIP 2.0 HTTP формат: {self.client_address}", 'ntrip')
+                    self.protocol_type = PT_NTRIP20
+                    _debug("Обнаружен NTRIP 2.0 HTTP формат: %s", self.client_address, module='ntrip')
                 else:
                     self.ntrip_version = "1.0"
-                    self.protocol_type = "ntrip1_0_http"
-                    log_debug(f"Обнаружен NTRIP 1.0 HTTP формат: {self.client_address}")
+                    self.protocol_type = PT_NTRIP10_HTTP
+                    _debug("Обнаружен NTRIP 1.0 HTTP формат: %s", self.client_address)
                 return
             
             # Проверить наличие Authorization заголовка (возможно NTRIP клиент)
@@ -424,70 +997,67 @@ class NTRIPHandler:
                 
                 if 'HTTP/1.1' in request_line:
                     self.ntrip_version = "2.0"
-                    self.protocol_type = "ntrip2_0"
-                    log_debug(f"Обнаружен NTRIP 2.0 HTTP формат аутентификации: {self.client_address}")
+                    self.protocol_type = PT_NTRIP20
+                    _debug("Обнаружен NTRIP 2.0 HTTP формат аутентификации: %s", self.client_address)
                 else:
                     self.ntrip_version = "1.0"
-                    self.protocol_type = "ntrip1_0_http"
-                    log_debug(f"Обнаружен NTRIP 1.0 HTTP формат аутентификации: {self.client_address}")
+                    self.protocol_type = PT_NTRIP10_HTTP
+                    _debug("Обнаружен NTRIP 1.0 HTTP формат аутентификации: %s", self.client_address)
                 return
             
-            # Извлекаем path из request_line для проверки
-            try:
-                request_parts = request_line.split()
-                if len(request_parts) >= 2:
-                    request_path = request_parts[1]
-                    if protocol_type == "http" and "ntrip" in user_agent and request_path not in ["/", ""]:
-                        self.ntrip_version = "2.0"
-                        self.protocol_type = "ntrip2_0"
-                        log_debug(f"NTRIP 2.0 определен по пути: {self.client_address}")
-                        return
-            except Exception:
-                pass  # Игнорируем ошибки парсинга в этом месте
+            # Проверить path из строки запроса
+            if len(parts) >= 2 and protocol_type == PT_HTTP and "ntrip" in ua_hits and parts[1] not in ("/", ""):
+                self.ntrip_version = "2.0"
+                self.protocol_type = PT_NTRIP20
+                _debug("NTRIP 2.0 определен по пути: %s", self.client_address)
+                return
         
         # Проверить заголовок Ntrip-Version (специфичен для NTRIP 2.0)
         ntrip_version = headers.get('ntrip-version', '')
         if 'NTRIP/2.0' in ntrip_version:
             self.ntrip_version = "2.0"
-            self.protocol_type = "ntrip2_0"
-            log_debug(f"Обнаружен NTRIP 2.0 протокол: {self.client_address}")
-        elif protocol_type == "http":
+            self.protocol_type = PT_NTRIP20
+            _debug("Обнаружен NTRIP 2.0 протокол: %s", self.client_address)
+        elif protocol_type == PT_HTTP:
             # HTTP запрос без заголовка Ntrip-Version, определить нужно ли понижение версии протокола
-            if self._should_downgrade_protocol(headers):
+            if self._should_downgrade_protocol(headers, ua_hits):
                 self.ntrip_version = "1.0"
-                self.protocol_type = "ntrip1_0"
-                log_debug(f"Протокол понижен до NTRIP 1.0: {self.client_address}")
+                self.protocol_type = PT_NTRIP10
+                _debug("Протокол понижен до NTRIP 1.0: %s", self.client_address)
             else:
                 # Попытка определить по User-Agent
-                user_agent = headers.get('user-agent', '').lower()
-                if any(keyword in user_agent for keyword in ['ntrip', 'rtk', 'gnss']):
+                if ua_hits & _NTRIP2_UA_KEYWORDS:
                     self.ntrip_version = "2.0"
-                    self.protocol_type = "ntrip2_0"
-                    log_debug(f"Определен NTRIP 2.0 по User-Agent: {self.client_address}")
+                    self.protocol_type = PT_NTRIP20
+                    _debug("Определен NTRIP 2.0 по User-Agent: %s", self.client_address)
                 else:
                     self.ntrip_version = "2.0"
-                    self.protocol_type = "http"
-                    log_debug(f"Использовать HTTP протокол: {self.client_address}")
+                    self.protocol_type = PT_HTTP
+                    _debug("Использовать HTTP протокол: %s", self.client_address)
         else:
             # В остальных случаях по умолчанию NTRIP 1.0
             self.ntrip_version = "1.0"
-            self.protocol_type = "ntrip1_0"
-            log_debug(f"По умолчанию используется NTRIP 1.0: {self.client_address}")
+            self.protocol_type = PT_NTRIP10
+            _debug("По умолчанию используется NTRIP 1.0: %s", self.client_address)
+    
+    def _log_ntrip1_request(self, version, key_prefix, method_token):
+        """Debug лог об обнаруженном SOURCE/ADMIN запросе с подавлением повторов от одного IP"""
+        if not _ntrip_log.isEnabledFor(logging.DEBUG):
+            return
+        message_key = f"{key_prefix}_{self.client_address[0]}"
+        if anti_spam_logger.should_log(message_key):
+            logger.log_debug(f"Обнаружен NTRIP {version} запрос: {method_token} - {self.client_address}", 'ntrip')
     
-    def _should_downgrade_protocol(self, headers):
+    def _should_downgrade_protocol(self, headers, ua_hits=None):
         """Определить, следует ли понизить версию протокола до NTRIP 1.0"""
         
-        user_agent = headers.get('user-agent', '').lower()
-        old_clients = ['ntrip', 'rtk', 'gnss', 'leica', 'trimble']
-        
-        for client in old_clients:
-            if client in user_agent and '2.0' not in user_agent:
-                return True
+        if ua_hits is None:
+            ua_hits = _user_agent_hits(headers)
         
-        required_headers = ['connection', 'host']
-        missing_headers = [h for h in required_headers if h not in headers]
+        if ua_hits & _OLD_CLIENTS and '2.0' not in ua_hits:
+            return True
         
-        return len(missing_headers) > 0
+        return not all(h in headers for h in _REQUIRED_HTTP_HEADERS)
     
     def _is_valid_request(self, method, path, headers):
         """Проверить валидность запроса"""
@@ -497,7 +1067,7 @@ class NTRIPHandler:
         if not path:
             return False, "Invalid path format"
         
-        if hasattr(self, 'protocol_type') and self.protocol_type == 'rtsp':
+        if self.protocol_type == PT_RTSP:
             # Проверка формата RTSP пути
             if not (path.startswith('/') or path.startswith('rtsp://')):
                 return False, "Invalid RTSP path format"
@@ -509,7 +1079,7 @@ class NTRIPHandler:
 
         # Для всех HTTP-подобных протоколов автоматически добавляем Host, если он отсутствует
         # Это позволяет работать с устройствами, которые не отправляют Host заголовок
-        if self.protocol_type in ['http', 'ntrip2_0', 'ntrip1_0_http']:
+        if self.protocol_type in _HOST_HEADER_PROTOCOLS:
             if 'host' not in headers:
                 # Используем IP адрес клиента и порт сервера для формирования Host
                 # Это стандартная практика когда Host заголовок отсутствует
@@ -520,20 +1090,15 @@ class NTRIPHandler:
                     # и порт сервера
                     host_value = f"{self.client_address[0]}:{server_port}"
                     headers['host'] = host_value
-                    log_debug(f"Автоматически добавлен Host заголовок для {self.protocol_type}: {host_value} (клиент: {self.client_address})")
+                    _debug("Автоматически добавлен Host заголовок для %s: %s (клиент: %s)", self.protocol_type, host_value, self.client_address)
                 except Exception as e:
                     # Если не удалось получить порт, используем дефолтное значение из конфигурации
                     host_value = f"{self.client_address[0]}:{config.NTRIP_PORT}"
                     headers['host'] = host_value
-                    log_debug(f"Использовано значение Host по умолчанию: {host_value} (клиент: {self.client_address}, ошибка: {e})")
+                    _debug("Использовано значение Host по умолчанию: %s (клиент: %s, ошибка: %s)", host_value, self.client_address, e)
         
-        supported_methods = ['GET', 'POST', 'SOURCE', 'ADMIN', 'OPTIONS']
-        
-        if hasattr(self, 'protocol_type') and self.protocol_type == 'rtsp':
-            rtsp_methods = ['DESCRIBE', 'SETUP', 'PLAY', 'PAUSE', 'TEARDOWN', 'RECORD']
-            supported_methods.extend(rtsp_methods)
-        
-        if method.upper() not in supported_methods:
+        if method not in _SUPPORTED_METHODS and not (
+                self.protocol_type == PT_RTSP and method in _RTSP_METHODS):
             return False, f"Unsupported method: {method}"
         
         return True, "Valid request"
@@ -546,51 +1111,17 @@ class NTRIPHandler:
         """Отфильтровать чувствительную информацию из данных запроса"""
         try:
             
-            lines = request_data.replace('\r\n', '\n').replace('\r', '\n').split('\n')
-            sanitized_lines = []
-
-            if lines:
-                first_line = lines[0].strip()
-                # Проверить, является ли это NTRIP 1.0 форматом (SOURCE password mount или GET mount password)
-                if (first_line.startswith('SOURCE ') and len(first_line.split()) >= 3) or \
-                   (first_line.startswith('GET ') and len(first_line.split()) >= 3):
-                    parts = first_line.split()
-                    if len(parts) >= 3:
-                        method = parts[0]
-                        if method == 'SOURCE':
-                            
-                            mount = parts[2]
-                            
-                            if len(parts) > 3:
-                                additional_info = ' '.join(parts[3:])
-                                sanitized_lines.append(f'{method} [PASSWORD_REDACTED] {mount} {additional_info}')
-                            else:
-                                sanitized_lines.append(f'{method} [PASSWORD_REDACTED] {mount}')
-                        elif method == 'GET':
-                            
-                            mount = parts[1]   
-                            sanitized_lines.append(f'{method} {mount} [PASSWORD_REDACTED]')
-                    else:
-                        sanitized_lines.append(first_line)
-                else:
-                    
-                    sanitized_lines.append(first_line)
+            # splitlines одним проходом учитывает \r\n, \r и \n
+            lines = request_data.splitlines() or ['']
+            sanitized_lines = [_redact_request_line(lines[0].strip())]
             
             for line in lines[1:]:
-                line_lower = line.lower()
-                
-                if 'authorization:' in line_lower:
-                    
-                    if 'basic' in line_lower:
-                        sanitized_lines.append('Authorization: Basic [REDACTED]')
-                    elif 'digest' in line_lower:
-                        sanitized_lines.append('Authorization: Digest [REDACTED]')
-                    else:
-                        sanitized_lines.append('Authorization: [REDACTED]')
+                if 'authorization:' in line.lower():
+                    sanitized_lines.append(_redact_authorization(line))
                 else:
                     sanitized_lines.append(line)
             
-            return '\n'.join(sanitized_lines).replace('\r', '').strip()
+            return '\n'.join(sanitized_lines).strip()
         except Exception:
             
             return '[REQUEST DATA - SANITIZATION FAILED]'
@@ -603,134 +1134,37 @@ class NTRIPHandler:
             mount_name = mount.lstrip('/')
             self.mount = mount_name
             
-            if self.protocol_type == "ntrip1_0":
+            protocol_type = self.protocol_type
+            # Имя схемы аутентификации регистронезависимо (RFC 7235)
+            scheme, sep, _ = auth_header.partition(' ')
+            scheme = scheme.lower() if sep else ''
+            
+            if protocol_type in _URL_PASSWORD_USER_PREFIX:
+                # NTRIP 0.8 использует только пароль из URL, заголовок Authorization не проверяется
+                handler_name = _AUTH_SCHEME_HANDLERS.get(scheme) if protocol_type != PT_NTRIP08 else None
+                if handler_name:
+                    return getattr(self, handler_name)(mount, auth_header, request_type)
                 
-                if auth_header.startswith('Basic '):
-                    return self._verify_basic_auth(mount, auth_header, request_type)
-                elif auth_header.startswith('Digest '):
-                    return self._verify_digest_auth(mount, auth_header, request_type)
-                elif hasattr(self, 'ntrip1_password') and self.ntrip1_password:
-                   
-                    mount_password = self.ntrip1_password
-                    
-
-                    is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username=None, password=None, mount_password=mount_password)
-                    
+                if self.ntrip1_password and not (auth_header and protocol_type in _URL_PASSWORD_WITHOUT_HEADER_ONLY):
+                    # Проверяется только точка монтирования и ее пароль, пользователь не проверяется
+                    is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username=None, password=None, mount_password=self.ntrip1_password, protocol_version="1.0")
                     if not is_valid:
                         return False, error_msg
                     
-                    self.username = f"source_{mount_name}"
+                    self.username = _URL_PASSWORD_USER_PREFIX[protocol_type] + mount_name
                     
                     return True, "Authentication successful"
-                else:
-                    
-                    return False, "Authentication required"
-            
-            elif self.protocol_type == "ntrip1_0_http":
-                 if auth_header.startswith('Basic '):
-                     return self._verify_basic_auth(mount, auth_header, request_type)
-                 elif auth_header.startswith('Digest '):
-                     return self._verify_digest_auth(mount, auth_header, request_type)
-                 else:
-                     
-                     if hasattr(self, 'ntrip1_password') and self.ntrip1_password:
-                         password = self.ntrip1_password
-                         
-                         is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username=None, password=None, mount_password=password, protocol_version="1.0")
-                         if not is_valid:
-                             return False, error_msg
-                         
-                         self.username = f"http_{mount_name}"
-                         
-                         return True, "Authentication successful"
-                     return False, "Missing authorization"
-            
-            # NTRIP 0.8 URL формат аутентификации (пароль обязателен)
-            elif self.protocol_type == "ntrip0_8":
-                 
-                 if hasattr(self, 'ntrip1_password') and self.ntrip1_password:
-                     password = self.ntrip1_password
-                     
-                     # Для NTRIP 0.8 формата проверять только точку монтирования и пароль, не проверять пользователя
-                     is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username=None, password=None, mount_password=password, protocol_version="1.0")
-                     
-                     if not is_valid:
-                         return False, error_msg
-                     
-                     self.username = f"ntrip08_{mount_name}"
-                     
-                     return True, "Authentication successful"
-                 else:
-                     
-                     return False, "Authentication required"
-            
-            elif self.protocol_type == "ntrip2_0":
-                 if auth_header.startswith('Basic '):
-                     return self._verify_basic_auth(mount, auth_header, request_type)
-                 elif auth_header.startswith('Digest '):
-                     return self._verify_digest_auth(mount, auth_header, request_type)
-                 elif not auth_header and hasattr(self, 'ntrip1_password') and self.ntrip1_password:
-                   
-                     password = self.ntrip1_password
-                     
-                     
-                     is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username=None, password=None, mount_password=password, protocol_version="1.0")
-                     if not is_valid:
-                         return False, error_msg
-                     
-                     self.username = f"ntrip20_{mount_name}"
-                     
-                     return True, "Authentication successful"
-                 else:
-                     return False, "Invalid authorization format"
-            
-            elif self.protocol_type == "rtsp":
-                 if auth_header.startswith('Basic '):
-                     return self._verify_basic_auth(mount, auth_header, request_type)
-                 elif auth_header.startswith('Digest '):
-                     return self._verify_digest_auth(mount, auth_header, request_type)
-                 elif not auth_header and hasattr(self, 'ntrip1_password') and self.ntrip1_password:
-
-                     password = self.ntrip1_password
-                     
-                     is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username=None, password=None, mount_password=password, protocol_version="1.0")
-                     if not is_valid:
-                         return False, error_msg
-                     
-                     self.username = f"rtsp_{mount_name}"
-                     
-                     return True, "Authentication successful"
-                 else:
-                     return False, "Invalid authorization format"
+                
+                return False, _MISSING_AUTH_MESSAGES[protocol_type]
             
-            else:
-                 if not auth_header:
-                     return False, "Missing authorization"
-
-                 if not auth_header.startswith('Basic '):
-                     return False, "Invalid authorization format"
-                 
-                 encoded_credentials = auth_header[6:]
-                 decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-                 
-                 if ':' not in decoded_credentials:
-                     return False, "Invalid credentials format"
-                 
-                 username, password = decoded_credentials.split(':', 1)
-                 self.username = username
-                 
-                 # Проверить точку монтирования и пользователя (по умолчанию используется протокол 1.0)
-                 is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username, password, mount_password=password, protocol_version="1.0")
-                 
-                 if not is_valid:
-                     return False, error_msg
-                 
-                 # Проверить ограничение количества подключений пользователя
-                 current_connections = connection.get_user_connection_count(username)
-                 if current_connections >= MAX_CONNECTIONS_PER_USER:
-                     return False, f"User connection limit exceeded (max: {MAX_CONNECTIONS_PER_USER})"
-                 
-                 return True, "Authentication successful"
+            if not auth_header:
+                return False, "Missing authorization"
+            
+            if scheme != 'basic':
+                return False, "Invalid authorization format"
+            
+            # Остальные протоколы: только Basic (точка монтирования и пользователь по протоколу 1.0)
+            return self._verify_basic_auth(mount, auth_header, request_type)
         
         except Exception as e:
             logger.log_error(f"Исключение при проверке пользователя: {e}", exc_info=True)
@@ -742,19 +1176,16 @@ class NTRIPHandler:
             # Унифицировать обработку имени точки монтирования
             mount_name = mount.lstrip('/')
             
-            encoded_credentials = auth_header[6:]
-            
-
             try:
-                decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
-            except (ValueError, UnicodeDecodeError) as e:
-                logger.log_debug(f"Не удалось декодировать Basic аутентификацию {self.client_address}: {e}", 'ntrip')
+                credentials = _decode_basic_credentials(auth_header)
+            except ValueError as e:
+                _debug("Не удалось декодировать Basic аутентификацию %s: %s", self.client_address, e, module='ntrip')
                 return False, "Invalid credentials format"
             
-            if ':' not in decoded_credentials:
+            if credentials is None:
                 return False, "Invalid credentials format"
             
-            username, password = decoded_credentials.split(':', 1)
+            username, password = credentials
             self.username = username
 
             if request_type == "download":
@@ -762,7 +1193,7 @@ class NTRIPHandler:
                 is_valid, error_msg = self.db_manager.verify_download_user(mount_name, username, password)
             else:
                 
-                if self.protocol_type == "ntrip2_0":
+                if self.protocol_type == PT_NTRIP20:
                     
                     is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username, password, mount_password=None, protocol_version="2.0")
                 else:
@@ -773,9 +1204,8 @@ class NTRIPHandler:
                 return False, error_msg
             
 
-            current_connections = connection.get_user_connection_count(username)
-            if current_connections >= MAX_CONNECTIONS_PER_USER:
-                return False, f"User connection limit exceeded (max: {MAX_CONNECTIONS_PER_USER})"
+            if _user_connection_limit_reached(username):
+                return False, USER_CONNECTION_LIMIT_MESSAGE
             
             return True, "Authentication successful"
         except Exception as e:
@@ -799,31 +1229,23 @@ class NTRIPHandler:
             
             self.username = username
             
-            stored_password = self.db_manager.get_user_password(username)
+            # Пароль пользователя и точка монтирования получаются одним запросом
+            record = self.db_manager.fetch_user_and_mount(mount_name, username)
+            stored_password = record[0]
             if not stored_password:
                 return False, "Invalid credentials"
 
             if not self._validate_digest_response(digest_params, stored_password, mount_name):
                 return False, "Invalid digest response"
 
-            if request_type == "download":
-               
-                is_valid, error_msg = self.db_manager.verify_download_user(mount_name, username, stored_password)
-            else:
-                
-                if self.protocol_type == "ntrip2_0":
-                    
-                    is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username, stored_password, mount_password=None, protocol_version="2.0")
-                else:
-                    
-                    is_valid, error_msg = self.db_manager.verify_mount_and_user(mount_name, username, stored_password, mount_password=stored_password, protocol_version="1.0")
+            protocol_version = "2.0" if self.protocol_type == PT_NTRIP20 else "1.0"
+            is_valid, error_msg = self.db_manager.check_digest_access(record, mount_name, username, protocol_version, request_type)
             
             if not is_valid:
                 return False, error_msg
             
-            current_connections = connection.get_user_connection_count(username)
-            if current_connections >= MAX_CONNECTIONS_PER_USER:
-                return False, f"User connection limit exceeded (max: {MAX_CONNECTIONS_PER_USER})"
+            if _user_connection_limit_reached(username):
+                return False, USER_CONNECTION_LIMIT_MESSAGE
             
             return True, "Authentication successful"
         except Exception as e:
@@ -832,23 +1254,10 @@ class NTRIPHandler:
     
     def _parse_digest_auth(self, auth_header):
         """Распарсить заголовок Digest аутентификации"""
-        import re
-        
-        digest_pattern = r'(\w+)=(?:"([^"]*)"|([^,\s]*))'  
-        matches = re.findall(digest_pattern, auth_header[7:])
-        
-        params = {}
-        for match in matches:
-            key = match[0]
-            value = match[1] if match[1] else match[2]
-            params[key] = value
-        
-        return params
+        return {key: quoted or plain for key, quoted, plain in _DIGEST_PARAM_RE.findall(auth_header, 7)}
     
     def _validate_digest_response(self, params, password, uri):
         """Проверить Digest ответ"""
-        import hashlib
-        
         try:
             username = params.get('username')
             realm = params.get('realm')
@@ -860,15 +1269,15 @@ class NTRIPHandler:
                 return False
             
             # HA1
-            ha1 = hashlib.md5(f"{username}:{realm}:{password}".encode()).hexdigest()
+            ha1 = _compute_ha1(username, realm, password)
             
             # HA2
-            ha2 = hashlib.md5(f"{method}:{uri}".encode()).hexdigest()
+            ha2 = _md5(f"{method}:{uri}".encode()).hexdigest()
             
             
-            expected_response = hashlib.md5(f"{ha1}:{nonce}:{ha2}".encode()).hexdigest()
+            expected_response = _md5(f"{ha1}:{nonce}:{ha2}".encode()).hexdigest()
             
-            return response.lower() == expected_response.lower()
+            return hmac.compare_digest(response.lower(), expected_response)
         except Exception:
             return False
     
@@ -877,7 +1286,7 @@ class NTRIPHandler:
     def handle_options(self, headers):
         """Обработать OPTIONS запрос (CORS предпроверка и т.д.)"""
         try:
-            logger.log_debug(f"OPTIONS запрос {self.client_address}")
+            _debug("OPTIONS запрос %s", self.client_address)
             
             # CORS заголовки ответа - удалены, NTRIP протокол не требует CORS
             # NTRIP клиенты не являются браузерами, не подвержены ограничениям CORS
@@ -889,7 +1298,7 @@ class NTRIPHandler:
                 content=""
             )
             
-            logger.log_debug(f"OPTIONS запрос обработан {self.client_address}")
+            _debug("OPTIONS запрос обработан %s", self.client_address)
             
         except Exception as e:
             logger.log_error(f"Исключение при обработке OPTIONS запроса {self.client_address}: {e}", exc_info=True)
@@ -901,9 +1310,7 @@ class NTRIPHandler:
             # Извлечь имя точки монтирования
             if path.startswith('rtsp://'):
                 # Извлечь точку монтирования из RTSP URL
-                from urllib.parse import urlparse
-                parsed = urlparse(path)
-                mount = parsed.path.lstrip('/')
+                mount = _split_source_url(path)[0].lstrip('/')
             else:
                 mount = path.lstrip('/')
             
@@ -922,18 +1329,9 @@ class NTRIPHandler:
                 return
             
             # Обработать в зависимости от типа RTSP команды
-            if method.upper() == 'DESCRIBE':
-                self._handle_rtsp_describe(mount, headers)
-            elif method.upper() == 'SETUP':
-                self._handle_rtsp_setup(mount, headers)
-            elif method.upper() == 'PLAY':
-                self._handle_rtsp_play(mount, headers)
-            elif method.upper() == 'PAUSE':
-                self._handle_rtsp_pause(mount, headers)
-            elif method.upper() == 'TEARDOWN':
-                self._handle_rtsp_teardown(mount, headers)
-            elif method.upper() == 'RECORD':
-                self._handle_rtsp_record(mount, headers)
+            handler_name = _RTSP_HANDLERS.get(method)
+            if handler_name:
+                getattr(self, handler_name)(mount, headers)
             else:
                 self.send_error_response(501, f"RTSP method not implemented: {method}")
                 
@@ -948,24 +1346,17 @@ class NTRIPHandler:
             self.send_error_response(404, "Mount point not found")
             return
         
-        # Сгенерировать SDP описание
+        # Сгенерировать SDP описание (Content-Type и Content-Length добавляет _send_response)
         sdp_content = self._generate_sdp_description(mount)
         
-        rtsp_headers = {
-            'Content-Type': 'application/sdp',
-            'Content-Length': str(len(sdp_content))
-        }
-        
-        self._send_response('RTSP/1.0 200 OK', content_type='application/sdp', 
-                          content=sdp_content, additional_headers=rtsp_headers)
+        self._send_response('RTSP/1.0 200 OK', content_type='application/sdp', content=sdp_content,
+                            additional_headers=[f"CSeq: {headers.get('cseq', '1')}"])
     
     def _handle_rtsp_setup(self, mount, headers):
         """Обработать RTSP SETUP команду"""
         # Проверить существует ли точка монтирования
         if not connection.check_mount_exists(mount):
-            cseq = headers.get('cseq', '1')
-            response_headers = {'CSeq': cseq}
-            self._send_response("RTSP/1.0 404 Not Found", additional_headers=response_headers)
+            self._send_response("RTSP/1.0 404 Not Found", additional_headers=[f"CSeq: {headers.get('cseq', '1')}"])
             return
         
         # Распарсить Transport заголовок
@@ -979,29 +1370,22 @@ class NTRIPHandler:
             except:
                 pass
         
-        session_id = f"{mount}-{int(time.time())}"
+        session_id = f"{mount}-{next(_rtsp_session_ids):x}"
         
-        cseq = headers.get('cseq', '1')
-        rtsp_headers = {
-            'CSeq': cseq,
-            'Transport': f'RTP/AVP;unicast;client_port={client_port};server_port=8002-8003',
-            'Session': session_id,
-            'Cache-Control': 'no-cache'
-        }
+        rtsp_headers = [
+            f"CSeq: {headers.get('cseq', '1')}",
+            _RTSP_TRANSPORT_TEMPLATE.format(client_port),
+            f"Session: {session_id}",
+            "Cache-Control: no-cache",
+        ]
         
         self._send_response('RTSP/1.0 200 OK', additional_headers=rtsp_headers)
     
     def _handle_rtsp_play(self, mount, headers):
         """Обработать RTSP PLAY команду"""
-        cseq = headers.get('cseq', '1')
-        session = headers.get('session', '')
-        
-        rtsp_headers = {
-            'CSeq': cseq,
-            'Session': session,
-            'Range': 'npt=0.000-',
-            'RTP-Info': f'url=rtsp://{config.HOST if config.HOST != "0.0.0.0" else "localhost"}:{config.NTRIP_PORT}/{mount};seq=1;rtptime=0'
-        }
+        rtsp_headers = self._rtsp_session_headers(headers)
+        rtsp_headers.append("Range: npt=0.000-")
+        rtsp_headers.append(f"RTP-Info: url=rtsp://{config.HOST if config.HOST != '0.0.0.0' else 'localhost'}:{config.NTRIP_PORT}/{mount};seq=1;rtptime=0")
         
         self._send_response('RTSP/1.0 200 OK', additional_headers=rtsp_headers)
         # Начать передачу потока данных
@@ -1009,58 +1393,29 @@ class NTRIPHandler:
     
     def _handle_rtsp_pause(self, mount, headers):
         """Обработать RTSP PAUSE команду"""
-        cseq = headers.get('cseq', '1')
-        session = headers.get('session', '')
-        
-        rtsp_headers = {
-            'CSeq': cseq,
-            'Session': session
-        }
-        
-        self._send_response('RTSP/1.0 200 OK', additional_headers=rtsp_headers)
+        self._send_response('RTSP/1.0 200 OK', additional_headers=self._rtsp_session_headers(headers))
     
     def _handle_rtsp_teardown(self, mount, headers):
         """Обработать RTSP TEARDOWN команду"""
-        cseq = headers.get('cseq', '1')
-        session = headers.get('session', '')
-        
-        rtsp_headers = {
-            'CSeq': cseq,
-            'Session': session
-        }
-        
-        self._send_response('RTSP/1.0 200 OK', additional_headers=rtsp_headers)
+        self._send_response('RTSP/1.0 200 OK', additional_headers=self._rtsp_session_headers(headers))
         # Очистить подключение
         self._cleanup()
     
     def _handle_rtsp_record(self, mount, headers):
         """Обработать RTSP RECORD команду"""
-        cseq = headers.get('cseq', '1')
-        session = headers.get('session', '')
-        
-        rtsp_headers = {
-            'CSeq': cseq,
-            'Session': session
-        }
-        
-        self._send_response('RTSP/1.0 200 OK', additional_headers=rtsp_headers)
+        self._send_response('RTSP/1.0 200 OK', additional_headers=self._rtsp_session_headers(headers))
         
         self.handle_upload('/' + mount, headers)
     
+    def _rtsp_session_headers(self, headers):
+        """Заголовки CSeq и Session ответа на RTSP команду"""
+        return [f"CSeq: {headers.get('cseq', '1')}", f"Session: {headers.get('session', '')}"]
+    
     def _generate_sdp_description(self, mount):
         """Сгенерировать SDP описание"""
         # Получить реальный IP адрес для SDP описания
         origin_ip = config.HOST if config.HOST != "0.0.0.0" else "127.0.0.1"
-        sdp = f"""v=0
-o=- 0 0 IN IP4 {origin_ip}
-s=NTRIP Stream {mount}
-c=IN IP4 0.0.0.0
-t=0 0
-m=application 0 RTP/AVP 96
-a=rtpmap:96 rtcm/1000
-a=control:*
-"""
-        return sdp
+        return _SDP_TEMPLATE.format_map({'ip': origin_ip, 'mount': mount})
     
     def handle_upload(self, path, headers):
         """Обработать запрос на загрузку"""
@@ -1068,19 +1423,16 @@ a=control:*
             # Использовать механизм защиты от спама для логирования HANDLE_UPLOAD
             message_key = f"handle_upload_{self.client_address[0]}_{path}"
             if anti_spam_logger.should_log(message_key):
-                suppressed = anti_spam_logger.get_suppressed_count(message_key)
-                if suppressed > 0:
-                    logger.log_info(f"HANDLE_UPLOAD вызван {self.client_address}: path={path} (подавлено {suppressed} похожих сообщений)")
-                else:
-                    logger.log_info(f"HANDLE_UPLOAD вызван {self.client_address}: path={path}")
-            logger.log_debug(f"handle_upload начал обработку {self.client_address}: path={path}")
+                logger.log_info(f"HANDLE_UPLOAD вызван {self.client_address}: path={path}")
+            _debug("handle_upload начал обработку %s: path=%s", self.client_address, path)
             
             # Вывести текущее состояние подключения
             # print(f"\n>>> Новый запрос на загрузку - IP: {self.client_address[0]}, точка монтирования: {path.lstrip('/')}, время: {datetime.now().strftime('%H:%M:%S.%f')[:-3]}")
             # print(f">>> Детали запроса - метод: POST, путь: {path}, пользовательский агент: {headers.get('User-Agent', 'Unknown')}")
             
-            connection.get_connection_manager().cleanup_zombie_connections()
-            connection.get_connection_manager().force_refresh_connections()
+            manager = connection.get_connection_manager()
+            manager.cleanup_zombie_connections()
+            manager.force_refresh_connections()
             
             # Извлечь имя точки монтирования
             mount = path.lstrip('/')
@@ -1090,17 +1442,13 @@ a=control:*
             
             self.mount = mount
              
-            if connection.get_connection_manager().is_mount_online(mount):
-                existing_mount = connection.get_connection_manager().get_mount_info(mount)
+            if manager.is_mount_online(mount):
+                existing_mount = manager.get_mount_info(mount)
                 if existing_mount and existing_mount['ip_address'] != self.client_address[0]:
                     
                     message_key = f"mount_occupied_{mount}_{existing_mount['ip_address']}"
                     if anti_spam_logger.should_log(message_key):
-                        suppressed = anti_spam_logger.get_suppressed_count(message_key)
-                        if suppressed > 0:
-                            logger.log_warning(f"Точка монтирования {mount} уже занята {existing_mount['ip_address']}, отклонено подключение от {self.client_address[0]} (подавлено {suppressed} похожих сообщений)")
-                        else:
-                            logger.log_warning(f"Точка монтирования {mount} уже занята {existing_mount['ip_address']}, отклонено подключение от {self.client_address[0]}")
+                        logger.log_warning(f"Точка монтирования {mount} уже занята {existing_mount['ip_address']}, отклонено подключение от {self.client_address[0]}")
                     self.send_error_response(409, f"Mount point {mount} is already online from {existing_mount['ip_address']}")
                     
                     try:
@@ -1111,14 +1459,14 @@ a=control:*
                 elif existing_mount and existing_mount['ip_address'] == self.client_address[0]:
                     logger.log_warning(f"Обнаружено повторное подключение с того же IP({self.client_address[0]}), возможно соединение было разорвано, разрешаем переподключение")
                     
-                    connection.get_connection_manager().remove_mount_connection(mount, "Повторное подключение с того же IP")
+                    manager.remove_mount_connection(mount, "Повторное подключение с того же IP")
             
             # Все запросы должны пройти полную проверку в базе данных, убедиться что точка монтирования существует и пароль правильный
             auth_header = headers.get('authorization', '')
-            logger.log_info(f"handle_upload начал проверку {self.client_address}: mount={mount}, auth_header={auth_header[:50] if auth_header else 'None'}")
+            _info("handle_upload начал проверку %s: mount=%s, auth_header=%s", self.client_address, mount, auth_header[:50] if auth_header else 'None')
             is_valid, message = self.verify_user(mount, auth_header)
             
-            logger.log_info(f"handle_upload результат проверки {self.client_address}: is_valid={is_valid}, message={message}")
+            _info("handle_upload результат проверки %s: is_valid=%s, message=%s", self.client_address, is_valid, message)
             
             if not is_valid:
                 logger.log_warning(f"handle_upload аутентификация не прошла {self.client_address}: {message}")
@@ -1131,7 +1479,7 @@ a=control:*
                 return
              
             try:
-                success, message = connection.get_connection_manager().add_mount_connection(mount, self.client_address[0], getattr(self, 'user_agent', 'Unknown'), getattr(self, 'ntrip_version', '1.0'), self.client_socket)
+                success, message = manager.add_mount_connection(mount, self.client_address[0], getattr(self, 'user_agent', 'Unknown'), getattr(self, 'ntrip_version', '1.0'), self.client_socket)
                 if not success:
                     logger.log_warning(f"Подключение к точке монтирования {mount} отклонено: {message}")
                     logger.log_info(f"Детали отклонения подключения - точка монтирования: {mount}, IP: {self.client_address[0]}, причина: {message}")
@@ -1154,10 +1502,9 @@ a=control:*
 
             self.send_upload_success_response()
             
-            username_for_log = getattr(self, 'username', mount) if hasattr(self, 'username') else mount
-            logger.log_mount_operation('upload_connected', mount, username_for_log)
+            logger.log_mount_operation('upload_connected', mount, self.username)
             
-            logger.log_info(f"=== Начало приема RTCM данных ===: mount={mount}")
+            _info("=== Начало приема RTCM данных ===: mount=%s", mount)
             self._receive_rtcm_data(mount)
         
         except Exception as e:
@@ -1175,17 +1522,14 @@ a=control:*
             mount = path.lstrip('/')
             self.mount = mount
 
-            auth_header = next((v for k, v in headers.items() if k.lower() == 'authorization'), '')
+            auth_header = headers.get('authorization', '')
             is_valid, message = self.verify_user(mount, auth_header, "download")
             
             if not is_valid:
                 self.send_auth_challenge(message)
                 return
             
-            if not self.db_manager.check_mount_exists_in_db(mount):
-                self.send_error_response(404, "Mount point not found")
-                return
-            
+            # Существование точки монтирования в базе уже проверено в verify_user
             # Добавить в менеджер подключений
             connection_id = connection.add_user_connection(self.username, mount, self.client_address[0])
             
@@ -1206,7 +1550,11 @@ a=control:*
             
             logger.log_client_connect(self.username, mount, self.client_address[0], self.user_agent)
             
-            self._keep_connection_alive()
+            # Рабочий поток больше не нужен: подключение обслуживают форвардер и поток наблюдения.
+            # detached ставится только после watch(): если watch() не удался, сокет и слот
+            # освобождает _handle_client_connection
+            _download_watcher.watch(self.client_socket, self._finish_download)
+            self.detached = True
         
         except Exception as e:
             logger.log_error(f"Исключение при обработке запроса на скачивание: {e}", exc_info=True)
@@ -1231,19 +1579,21 @@ a=control:*
     def _receive_rtcm_data(self, mount):
         """Цикл приема RTCM данных"""
         try:
+            # Прием в буфер потока: recv(BUFFER_SIZE) выделял бы BUFFER_SIZE байт на каждый пакет
+            view = memoryview(_recv_buffer())
             while True:
                 try:
-                    data = self.client_socket.recv(BUFFER_SIZE)
-                    if not data:
+                    received = self.client_socket.recv_into(view)
+                    if not received:
                         # Подключение закрыто
-                        logger.log_debug(f"Подключение к точке монтирования {mount} закрыто", 'ntrip')
+                        _debug("Подключение к точке монтирования %s закрыто", mount, module='ntrip')
                         break
                     
                     # Логирование получения данных от базы (можно убрать или перевести на DEBUG)
                     # logger.log_debug(f"Получены данные от базы {mount}: {len(data)} байт", 'ntrip')
-                    forwarder.upload_data(mount, data)
-
-                    connection.get_connection_manager().update_mount_data_stats(mount, len(data))
+                    # Статистику точки монтирования обновляет сам upload_data.
+                    # Форвардер хранит данные в кольцевом буфере, поэтому передается копия полученной части
+                    forwarder.upload_data(mount, bytes(view[:received]))
                     
                 except OSError as e:
                     # Безопасная обработка ошибок сокета для кроссплатформенности
@@ -1263,12 +1613,12 @@ a=control:*
                     )
                     
                     if is_socket_closed:
-                        logger.log_debug(f"Сокет точки монтирования {mount} закрыт, прекращаем прием данных", 'ntrip')
+                        _debug("Сокет точки монтирования %s закрыт, прекращаем прием данных", mount, module='ntrip')
                     else:
                         logger.log_error(f"Ошибка сокета точки монтирования {mount}: {e} (код: {error_code})", 'ntrip')
                     break
                 except socket.timeout:
-                    logger.log_debug(f"Таймаут приема данных точки монтирования {mount}", 'ntrip')
+                    _debug("Таймаут приема данных точки монтирования %s", mount, module='ntrip')
                     continue
         
         except Exception as e:
@@ -1290,98 +1640,64 @@ a=control:*
 
                 logger.log_mount_operation('disconnected', mount)
                 # Изменено на уровень debug, чтобы избежать частых логов
-                log_debug(f"Отложенная очистка точки монтирования {mount} завершена")
+                _debug("Отложенная очистка точки монтирования %s завершена", mount)
             
             # Записать событие разрыва, изменено на уровень warning чтобы важная информация была записана
             log_warning(f"Подключение точки монтирования {mount} разорвано, очистка данных через 1.5 секунд")
             
 
-            cleanup_timer = threading.Timer(1.5, delayed_cleanup)
-            cleanup_timer.daemon = True  # Установить как демон-поток
-            cleanup_timer.start()
+            _delayed_calls.schedule(1.5, delayed_cleanup)
             
 
             self._cleanup()
     
-    def _keep_connection_alive(self):
-        """Поддерживать активное подключение для скачивания"""
+    def _finish_download(self):
+        """Завершить подключение для скачивания (вызывается потоком наблюдения)"""
         try:
-            
-            while True:
-                time.sleep(5)  
-                
-                if hasattr(self, 'client_info') and self.client_info:
-                    
-                    try:
-                        
-                        self.client_socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
-                    except (OSError, AttributeError):
-                        break
-                else:
-                    break
-        except:
-            
-            pass
+            forwarder.remove_client(self.client_info)
+            logger.log_client_disconnect(self.username, self.mount, self.client_address[0])
         finally:
-            
-            if hasattr(self, 'client_info') and self.client_info:
-                forwarder.remove_client(self.client_info)
-                logger.log_client_disconnect(self.username, self.mount, self.client_address[0])
+            try:
+                self.client_socket.close()
+            except OSError:
+                pass
+            if self.on_detached_close:
+                self.on_detached_close()
     
     def _send_mount_list(self):
         """Отправить список точек монтирования"""
         try:
-            from . import config
-            from datetime import datetime
-            
-            mount_list = connection.generate_mount_list()
-            logger.log_debug(f"Сгенерирован список точек монтирования: {mount_list}", 'ntrip')
-            
-            
-            content_lines = []
-            
-            # Добавить CAS информацию (информация о Caster)
-            # Переиспользовать существующую конфигурацию: server_name=author, server_port=NTRIP_PORT, operator=APP_NAME, network_name=author, website_url=APP_WEBSITE, fallback_ip=HOST
-            cas_line = f"CAS;{config.APP_AUTHOR};{config.NTRIP_PORT};{config.APP_NAME};{config.APP_AUTHOR};0;{config.CASTER_COUNTRY};{config.CASTER_LATITUDE};{config.CASTER_LONGITUDE};{config.HOST};0;{config.APP_WEBSITE}"
-            content_lines.append(cas_line)
-            
-            # Добавить NET информацию (информация о сети)
-            net_line = f"NET;{config.APP_AUTHOR};{config.APP_AUTHOR};B;{config.CASTER_COUNTRY};{config.APP_WEBSITE};{config.APP_WEBSITE};{config.APP_CONTACT};none"
-            content_lines.append(net_line)
+            mount_list = connection.generate_sourcetable_lines()
+            _debug("Сгенерирован список точек монтирования: %s", mount_list, module='ntrip')
             
-            # Добавить данные STR таблицы
-            content_lines.extend(mount_list)
-            
-            # Преобразовать содержимое в строку
-            content_str = '\r\n'.join(content_lines) + '\r\n' if content_lines else '\r\n'
-            log_debug(f"Длина содержимого списка точек монтирования: {len(content_str)}")
+            # Содержимое: готовые строки CAS и NET, затем STR таблица; строки STR уже закодированы
+            body = _SOURCETABLE_HEAD
+            if mount_list:
+                body += b'\r\n'.join(mount_list) + b'\r\n'
+            _debug("Длина содержимого списка точек монтирования: %s", len(body))
             
             # Для совместимости с «капризными» роверами всегда отправляем SOURCETABLE 200 OK (формат NTRIP 1.0).
             # Многие клиенты, даже заявляя поддержку NTRIP 2.0, ожидают именно этот формат списка.
-            current_time = datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S GMT')
-            
-            response_lines = [
-                "SOURCETABLE 200 OK",
-                f"Server: NTRIP 2RTK caster {config.APP_VERSION}",
-                f"Date: {current_time}",
-                "Ntrip-Version: Ntrip/1.0",
-                f"Content-Length: {len(content_str.encode('utf-8'))}",
-                "Content-Type: text/plain",
-                "Connection: close",
-                "",  # Пустая строка разделяет заголовки и содержимое
-                content_str,
-                "ENDSOURCETABLE"
-            ]
-            
-            response = '\r\n'.join(response_lines)
-            log_debug(f"Содержимое ответа SOURCETABLE: {repr(response[:200])}...")
+            header = (
+                b"SOURCETABLE 200 OK\r\n"
+                b"%s"
+                b"Date: %s\r\n"
+                b"Ntrip-Version: Ntrip/1.0\r\n"
+                b"Content-Length: %d\r\n"
+                b"Content-Type: text/plain\r\n"
+                b"Connection: close\r\n"
+                b"\r\n"  # Пустая строка разделяет заголовки и содержимое
+            ) % (_SOURCETABLE_SERVER_HEADER, _http_date(), len(body))
+            
+            _debug("Заголовок ответа SOURCETABLE: %r", header)
             try:
-                self.client_socket.send(response.encode('utf-8'))
-                log_debug(f"Отправлен список точек монтирования (формат SOURCETABLE) на {self.client_address}")
+                # Заголовок, таблица и завершающая строка уходят одной записью без склейки буферов
+                self._send_gathered(header, body, b'\r\nENDSOURCETABLE')
+                _debug("Отправлен список точек монтирования (формат SOURCETABLE) на %s", self.client_address)
             except Exception as e:
                 logger.log_error(f"Не удалось отправить список точек монтирования (SOURCETABLE): {e}", exc_info=True)
             
-            log_debug(f"Отправка списка точек монтирования на {self.client_address}")
+            _debug("Отправка списка точек монтирования на %s", self.client_address)
         
         except Exception as e:
             log_error(f"Исключение при отправке списка точек монтирования: {e}", exc_info=True)
@@ -1396,8 +1712,7 @@ a=control:*
         else:
             # NTRIP 1.0 формат
             try:
-                response = "ICY 200 OK\r\n\r\n"
-                self.client_socket.send(response.encode('utf-8'))
+                self.client_socket.sendall(_ICY_200_OK)
             except Exception as e:
                 logger.log_error(f"Не удалось отправить ответ об успешной загрузке: {e}", exc_info=True)
     
@@ -1407,9 +1722,8 @@ a=control:*
         # Это решает проблемы совместимости с роверами, которые заявляют поддержку 2.0,
         # но по факту ожидают старый формат ответа и сырой поток данных.
         try:
-            response = "ICY 200 OK\r\nConnection: close\r\n\r\n"
-            self.client_socket.send(response.encode('utf-8'))
-            logger.log_debug(f"Отправлен принудительный ответ ICY 200 OK для {self.client_address}", 'ntrip')
+            self.client_socket.sendall(_ICY_200_OK_CLOSE)
+            _debug("Отправлен принудительный ответ ICY 200 OK для %s", self.client_address, module='ntrip')
         except Exception as e:
             logger.log_error(f"Не удалось отправить ответ об успешной загрузке: {e}", exc_info=True)
             
@@ -1434,37 +1748,25 @@ a=control:*
     
     def send_auth_challenge(self, message="Authentication required", auth_type="both"):
         """Отправить запрос на аутентификацию"""
-        import secrets
-        import time
-        
         # Сгенерировать nonce для Digest аутентификации
         nonce = secrets.token_hex(16)
-        realm = "NTRIP"
         
         # Построить заголовок аутентификации
-        auth_headers = []
-        if auth_type in ["basic", "both"]:
-            auth_headers.append(f'WWW-Authenticate: Basic realm="{realm}"')
-        
-        if auth_type in ["digest", "both"]:
-            digest_header = f'WWW-Authenticate: Digest realm="{realm}", nonce="{nonce}", algorithm=MD5, qop="auth"'
-            auth_headers.append(digest_header)
+        auth_bytes = _AUTH_BASIC if auth_type in ("basic", "both") else b""
+        if auth_type in ("digest", "both"):
+            auth_bytes += _AUTH_DIGEST_PREFIX + nonce.encode('ascii') + _AUTH_DIGEST_SUFFIX
         
         if self.ntrip_version == "2.0":
             self._send_response(
                 "HTTP/1.1 401 Unauthorized",
                 content_type="text/plain",
                 content=message,
-                additional_headers=auth_headers
+                raw_headers=auth_bytes
             )
         else:
             # NTRIP 1.0 формат
             try:
-                response = "SOURCETABLE 401 Unauthorized\r\n"
-                for header in auth_headers:
-                    response += f"{header}\r\n"
-                response += "\r\n"
-                self.client_socket.send(response.encode('utf-8'))
+                self.client_socket.sendall(b"SOURCETABLE 401 Unauthorized\r\n" + auth_bytes + b"\r\n")
             except Exception as e:
                 logger.log_error(f"Не удалось отправить запрос на аутентификацию: {e}", exc_info=True)
     
@@ -1472,15 +1774,7 @@ a=control:*
         """Отправить HTTP ответ об ошибке"""
         if self.ntrip_version == "2.0":
             # Получить стандартное HTTP сообщение о статусе
-            status_messages = {
-                400: "Bad Request",
-                401: "Unauthorized", 
-                404: "Not Found",
-                405: "Method Not Allowed",
-                409: "Conflict",
-                500: "Internal Server Error"
-            }
-            status_text = status_messages.get(code, "Error")
+            status_text = _HTTP_STATUS_MESSAGES.get(code, "Error")
             
             self._send_response(
                 f"HTTP/1.1 {code} {status_text}",
@@ -1490,84 +1784,100 @@ a=control:*
         else:
             # NTRIP 1.0 формат
             try:
-                response = f"ERROR {code} {message}\r\n\r\n"
-                self.client_socket.send(response.encode('utf-8'))
+                self.client_socket.sendall(b"ERROR %d %s\r\n\r\n" % (code, message.encode('utf-8')))
             except Exception as e:
                 logger.log_error(f"Не удалось отправить ответ об ошибке: {e}", exc_info=True)
     
-    def _generate_standard_headers(self, additional_headers=None):
-        """Сгенерировать стандартные HTTP заголовки ответа"""
-        current_time = datetime.now(timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT')
-        headers = []
-        
+    def _write_standard_headers(self, out, additional_headers):
+        """Дописать в out стандартные HTTP заголовки ответа (additional_headers только проверяются для RTSP)"""
         # Добавить соответствующие заголовки в зависимости от версии протокола
-        if self.protocol_type == "ntrip2_0":
+        if self.protocol_type == PT_NTRIP20:
             # Обязательные поля заголовка для NTRIP 2.0 (см. ntrip_header_element)
-            headers.append("Ntrip-Version: NTRIP/2.0")
-            headers.append("Cache-Control: no-cache, no-store, must-revalidate")
-            headers.append("Pragma: no-cache")
-            headers.append("Expires: 0")
-        elif self.protocol_type == "rtsp":
-            headers.append("CSeq: 1")
-            headers.append(f"Session: {id(self)}")
+            out += _NTRIP2_RESPONSE_HEADERS
+        elif self.protocol_type == PT_RTSP:
+            # Значения по умолчанию, если обработчик RTSP команды не передал свои
+            if not any(h.startswith('CSeq:') for h in additional_headers):
+                out += b"CSeq: 1\r\n"
+            if not any(h.startswith('Session:') for h in additional_headers):
+                out += b"Session: %d\r\n" % id(self)
         elif self.ntrip_version == "2.0":
-            headers.append("Ntrip-Version: NTRIP/2.0")
+            out += _NTRIP2_VERSION_HEADER
         
         # Общие поля заголовка
-        headers.append(f"Date: {current_time}")
-        headers.append(f"Server: {config.APP_NAME}/{config.VERSION}")
+        out += b"Date: "
+        out += _http_date()
+        out += b"\r\n"
+        out += _SERVER_HEADER
         
         # Заголовки, связанные с безопасностью
-        headers.append("X-Content-Type-Options: nosniff")
-        headers.append("X-Frame-Options: DENY")
-        
-        if additional_headers:
-            headers.extend(additional_headers)
-        
-        return "\r\n".join(headers) + "\r\n"
+        out += _SECURITY_HEADERS
     
-    def _send_response(self, status_line, content_type=None, content=None, additional_headers=None):
-        """Отправить стандартизированный HTTP ответ"""
+    def _send_response(self, status_line, content_type=None, content=None, additional_headers=None, raw_headers=b""):
+        """Отправить стандартизированный HTTP ответ.
+        
+        raw_headers - готовые строки заголовков в байтах (с CRLF), дописываются после остальных
+        """
         try:
-            response = status_line + "\r\n"
-            
-            headers = []
+            # Ответ собирается сразу в байтах; Content-Length - длина тела в байтах
+            body = content.encode('utf-8') if content else b''
+            additional_headers = additional_headers or ()
+            
+            # Строка статуса и тип содержимого - ASCII; UTF-8 нужен только телу
+            # и дополнительным заголовкам, которые могут повторять значения из запроса
+            out = _send_buffer()
+            out += status_line.encode('ascii')
+            out += b"\r\n"
+            self._write_standard_headers(out, additional_headers)
             if content_type:
-                headers.append(f"Content-Type: {content_type}")
-            if content:
-                headers.append(f"Content-Length: {len(content)}")
-            
-            response += self._generate_standard_headers(headers + (additional_headers or []))
-            response += "\r\n"
+                out += b"Content-Type: %s\r\n" % content_type.encode('ascii')
+            if body:
+                out += b"Content-Length: %d\r\n" % len(body)
+            for header in additional_headers:
+                out += header.encode('utf-8')
+                out += b"\r\n"
+            out += raw_headers
+            out += b"\r\n"
             
-            if content:
-                response += content
-            
-            self.client_socket.send(response.encode('utf-8'))
+            self._send_gathered(out, body)
             
         except Exception as e:
             logger.log_error(f"Не удалось отправить ответ: {e}", exc_info=True)
     
+    def _send_gathered(self, *chunks):
+        """Отправить несколько буферов одним вызовом sendmsg, без их склейки в один буфер.
+        
+        При частичной записи отправка продолжается с места остановки, как в sendall
+        """
+        if not _HAS_SENDMSG:
+            self.client_socket.sendall(b''.join(chunks))
+            return
+        
+        views = [memoryview(chunk) for chunk in chunks if chunk]
+        try:
+            while views:
+                sent = self.client_socket.sendmsg(views)
+                while views and sent >= len(views[0]):
+                    sent -= len(views[0])
+                    views.pop(0).release()
+                if sent:
+                    views[0] = views[0][sent:]
+        finally:
+            # Освободить буферы сразу: буфер ответа потока переиспользуется следующим ответом
+            for view in views:
+                view.release()
+    
     def _cleanup(self):
         """Очистить ресурсы"""
         try:
             # print(f"\n>>> Начало очистки подключения - IP: {self.client_address[0]}, время: {datetime.now().strftime('%H:%M:%S.%f')[:-3]}")
 
-            if hasattr(self, 'username') and hasattr(self, 'mount'):
-                if hasattr(self, 'client_info'):  # Подключение для скачивания
-                    # print(f">>> Удалить подключение пользователя - пользователь: {self.username}, точка монтирования: {self.mount}")
-                    connection.remove_user_connection(self.username, self.client_address[0], self.mount)
-                else:  # Подключение для загрузки
-                    # Только действительно успешно установленные подключения точек монтирования удаляются при разрыве
-                    if hasattr(self, 'mount_connection_established') and self.mount_connection_established:
-                        # print(f">>> Удалить подключение точки монтирования - точка монтирования: {self.mount}")
-                        connection.remove_mount_connection(self.mount)
-                    else:
-                        # print(f">>> Пропустить удаление подключения точки монтирования - точка монтирования: {self.mount} (подключение не было успешно установлено)")
-                        pass
-            else:
-                # print(f">>> Пропустить удаление подключения - username существует: {hasattr(self, 'username')}, mount существует: {hasattr(self, 'mount')}") 
-                pass
+            if self.client_info is not None:  # Подключение для скачивания
+                # print(f">>> Удалить подключение пользователя - пользователь: {self.username}, точка монтирования: {self.mount}")
+                connection.remove_user_connection(self.username, self.client_address[0], self.mount)
+            elif self.mount_connection_established:  # Подключение для загрузки
+                # Только действительно успешно установленные подключения точек монтирования удаляются при разрыве
+                # print(f">>> Удалить подключение точки монтирования - точка монтирования: {self.mount}")
+                connection.remove_mount_connection(self.mount)
             
             self.client_socket.close()
             # print(f">>> Очистка подключения завершена - IP: {self.client_address[0]}")
@@ -1577,16 +1887,29 @@ a=control:*
 class NTRIPCaster:
     """NTRIP Caster сервер - использует пул потоков для обработки множества одновременных подключений"""
     
+    __slots__ = ('server_socket', 'running', 'db_manager', 'thread_pool', 'connection_slots', 'queue_slots',
+                 'active_connections', 'queued_connections', '_counts_lock',
+                 'total_connections', 'rejected_connections', '_wake_r', '_wake_w')
+    
     def __init__(self, db_manager):
         self.server_socket = None
+        # Пара сокетов для пробуждения главного цикла при остановке
+        self._wake_r = self._wake_w = None
         self.running = False
         self.db_manager = db_manager
 
         self.thread_pool = None
-        self.connection_queue = Queue(maxsize=CONNECTION_QUEUE_SIZE)
+        # Слоты подключений: занимаются при accept и освобождаются при закрытии сокета
+        self.connection_slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+        # Подключения, переданные в пул потоков, но еще не взятые рабочим потоком
+        self.queue_slots = threading.BoundedSemaphore(CONNECTION_QUEUE_SIZE)
+        # Число занятых слотов для статистики: семафоры не предоставляют текущее значение.
+        # Блокировка защищает только изменение счетчиков, допуск подключений решают семафоры
         self.active_connections = 0
-        self.connection_lock = threading.Lock()
+        self.queued_connections = 0
+        self._counts_lock = threading.Lock()
 
+        # Счетчики изменяются только потоком главного цикла
         self.total_connections = 0
         self.rejected_connections = 0
     
@@ -1610,14 +1933,15 @@ class NTRIPCaster:
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind(('0.0.0.0', NTRIP_PORT))
         self.server_socket.listen(MAX_CONNECTIONS)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
         self.running = True
         
         self.thread_pool = ThreadPoolExecutor(
             max_workers=MAX_WORKERS,
             thread_name_prefix="NTRIP-Worker"
         )
-        
-        self._start_connection_handler()
 
         ntrip_urls = config.get_display_urls(NTRIP_PORT, "NTRIP сервер")
         if len(ntrip_urls) == 1:
@@ -1631,95 +1955,173 @@ class NTRIPCaster:
     
 
     def _main_loop(self):
-        """Главный цикл, принимает клиентские подключения"""
-        while self.running:
+        """
+        Главный цикл, принимает клиентские подключения.
+        Новые подключения ожидают первый запрос в селекторе и передаются в пул потоков
+        только после поступления данных, поэтому медленные и простаивающие клиенты не занимают рабочие потоки
+        """
+        selector = selectors.DefaultSelector()
+        self.server_socket.setblocking(False)
+        selector.register(self.server_socket, selectors.EVENT_READ)
+        selector.register(self._wake_r, selectors.EVENT_READ)
+        pending = {}  # сокет клиента -> (адрес клиента, срок ожидания запроса)
+        next_expire_check = time.monotonic() + 1.0
+        
+        try:
+            while self.running:
+                try:
+                    events = selector.select(timeout=1.0)
+                    for key, _ in events:
+                        if key.fileobj is self.server_socket:
+                            self._accept_connections(selector, pending)
+                        elif key.fileobj is self._wake_r:
+                            # stop() уже сбросил running, цикл завершится после этой итерации
+                            continue
+                        else:
+                            client_socket = key.fileobj
+                            selector.unregister(client_socket)
+                            client_address, _ = pending.pop(client_socket)
+                            self._dispatch_connection(client_socket, client_address)
+                    
+                    now = time.monotonic()
+                    if now >= next_expire_check:
+                        next_expire_check = now + 1.0
+                        self._expire_pending_connections(selector, pending, now)
+                
+                except socket.error as e:
+                    if self.running:
+                        log_error(f"Исключение при принятии подключения: {e}", exc_info=True)
+                    break
+                except Exception as e:
+                    log_error(f"Исключение в главном цикле: {e}", exc_info=True)
+                    break
+        finally:
+            for client_socket in pending:
+                self._close_pending(client_socket)
+            selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
+    
+    def _accept_connections(self, selector, pending):
+        """Принять все ожидающие подключения и поставить их на ожидание первого запроса"""
+        while True:
             try:
                 client_socket, client_address = self.server_socket.accept()
-                
-                # Проверить ограничение количества подключений
-                with self.connection_lock:
-                    if self.active_connections >= MAX_CONNECTIONS:
-                        log_warning(f"Достигнуто максимальное количество подключений {MAX_CONNECTIONS}, отклонено подключение {client_address}")
-                        client_socket.close()
-                        self.rejected_connections += 1
-                        continue
-
-                try:
-                    self.connection_queue.put((client_socket, client_address), timeout=1.0)
-                    with self.connection_lock:
-                        self.total_connections += 1
-                    log_info(f"Принято подключение от {client_address}, размер очереди: {self.connection_queue.qsize()}, активных подключений: {self.active_connections}")
-                except Full:
-                    log_warning(f"Очередь подключений заполнена, отклонено подключение {client_address}")
-                    client_socket.close()
-                    self.rejected_connections += 1
+            except BlockingIOError:
+                return
             
-            except socket.error as e:
-                if self.running:
-                    log_error(f"Исключение при принятии подключения: {e}", exc_info=True)
-                break
-            except Exception as e:
-                log_error(f"Исключение в главном цикле: {e}", exc_info=True)
-                break
-    
-    def _start_connection_handler(self):
-        """Запустить поток обработчика подключений"""
-        handler_thread = Thread(target=self._connection_handler, daemon=True)
-        handler_thread.start()
-        log_debug("Обработчик подключений запущен")
-    
-    def _connection_handler(self):
-        """Обработчик подключений, извлекает подключения из очереди и передает в пул потоков"""
-        while self.running:
-            try:
-                
-                client_socket, client_address = self.connection_queue.get(timeout=1.0)
-                
-                future = self.thread_pool.submit(self._handle_client_connection, client_socket, client_address)
-
-                with self.connection_lock:
-                    self.active_connections += 1
-                
-                log_info(f"Подключение {client_address} передано в пул потоков для обработки")
-                
-            except Empty:
-                
+            client_socket.setblocking(True)
+            
+            # Проверить ограничение количества подключений
+            if not self._acquire_connection_slot():
+                log_warning(f"Достигнуто максимальное количество подключений {MAX_CONNECTIONS}, отклонено подключение {client_address}")
+                client_socket.close()
+                self.rejected_connections += 1
                 continue
-            except Exception as e:
-                log_error(f"Исключение в обработчике подключений: {e}", exc_info=True)
+            
+            selector.register(client_socket, selectors.EVENT_READ)
+            pending[client_socket] = (client_address, time.monotonic() + config.SOCKET_TIMEOUT)
+    
+    def _expire_pending_connections(self, selector, pending, now):
+        """Закрыть подключения, не приславшие запрос за SOCKET_TIMEOUT"""
+        expired = [client_socket for client_socket, (_, deadline) in pending.items() if deadline <= now]
+        for client_socket in expired:
+            client_address, _ = pending.pop(client_socket)
+            selector.unregister(client_socket)
+            self._close_pending(client_socket)
+            _debug("Клиент %s - таймаут подключения", client_address)
+    
+    def _close_pending(self, client_socket):
+        """Закрыть подключение, не переданное в пул потоков, и освободить его слот"""
+        try:
+            client_socket.close()
+        except Exception:
+            pass
+        self._release_connection_slot()
+    
+    def _dispatch_connection(self, client_socket, client_address):
+        """Передать подключение с поступившим запросом напрямую в пул потоков.
+        
+        Очередь ожидания - внутренняя очередь пула, ее длина ограничена CONNECTION_QUEUE_SIZE
+        """
+        if not self._acquire_queue_slot():
+            self.rejected_connections += 1
+            log_warning(f"Очередь подключений заполнена, отклонено подключение {client_address}")
+            self._close_pending(client_socket)
+            return
+        
+        try:
+            self.thread_pool.submit(self._handle_client_connection, client_socket, client_address)
+        except RuntimeError:
+            # Пул уже остановлен
+            self._release_queue_slot()
+            self._close_pending(client_socket)
+            return
+        
+        self.total_connections += 1
+        _info("Принято подключение от %s, размер очереди: %d, активных подключений: %d", client_address, self.queued_connections, self.active_connections)
     
     def _handle_client_connection(self, client_socket, client_address):
         """Обработать одно клиентское подключение"""
+        self._release_queue_slot()
+        detached = False
         try:
             
-            handler = NTRIPHandler(client_socket, client_address, self.db_manager)
+            handler = NTRIPHandler(client_socket, client_address, self.db_manager, self._release_connection_slot)
             handler.handle_request()
+            detached = handler.detached
         except Exception as e:
             log_error(f"Исключение при обработке клиентского подключения {client_address}: {e}", exc_info=True)
         finally:
-           
-            with self.connection_lock:
-                self.active_connections -= 1
-            
-            try:
-                client_socket.close()
-            except:
-                pass
-            
-            log_info(f"Обработка клиентского подключения {client_address} завершена, активных подключений: {self.active_connections}")
+            if detached:
+                # Сокет и слот подключения освободит поток наблюдения
+                _debug("Подключение для скачивания %s передано потоку наблюдения", client_address)
+            else:
+                try:
+                    client_socket.close()
+                except:
+                    pass
+                self._release_connection_slot()
+                
+                _info("Обработка клиентского подключения %s завершена, активных подключений: %d", client_address, self.active_connections)
+    
+    def _acquire_connection_slot(self):
+        """Занять слот подключения (включая ожидающие первого запроса); False, если слотов нет"""
+        if not self.connection_slots.acquire(blocking=False):
+            return False
+        with self._counts_lock:
+            self.active_connections += 1
+        return True
+    
+    def _release_connection_slot(self):
+        with self._counts_lock:
+            self.active_connections -= 1
+        self.connection_slots.release()
+    
+    def _acquire_queue_slot(self):
+        """Занять место в очереди ожидания рабочего потока; False, если очередь заполнена"""
+        if not self.queue_slots.acquire(blocking=False):
+            return False
+        with self._counts_lock:
+            self.queued_connections += 1
+        return True
+    
+    def _release_queue_slot(self):
+        with self._counts_lock:
+            self.queued_connections -= 1
+        self.queue_slots.release()
     
     def get_performance_stats(self):
         """Получить статистику производительности"""
-        with self.connection_lock:
-            return {
-                'active_connections': self.active_connections,
-                'total_connections': self.total_connections,
-                'rejected_connections': self.rejected_connections,
-                'queue_size': self.connection_queue.qsize(),
-                'max_connections': MAX_CONNECTIONS,
-                'max_workers': MAX_WORKERS,
-                'connection_queue_size': CONNECTION_QUEUE_SIZE
-            }
+        return {
+            'active_connections': self.active_connections,
+            'total_connections': self.total_connections,
+            'rejected_connections': self.rejected_connections,
+            'queue_size': self.queued_connections,
+            'max_connections': MAX_CONNECTIONS,
+            'max_workers': MAX_WORKERS,
+            'connection_queue_size': CONNECTION_QUEUE_SIZE
+        }
     
     def log_performance_stats(self):
         """Записать статистику производительности"""
@@ -1736,6 +2138,13 @@ class NTRIPCaster:
         
         self.running = False
         
+        if self._wake_w:
+            try:
+                self._wake_w.send(b'x')
+            except OSError:
+                # Главный цикл уже завершился и закрыл сокеты пробуждения
+                pass
+        
         if self.server_socket:
             try:
                 self.server_socket.close()
@@ -1748,16 +2157,6 @@ class NTRIPCaster:
             self.thread_pool.shutdown(wait=True)
             log_system_event("Пул потоков закрыт")
         
-        while not self.connection_queue.empty():
-            try:
-                client_socket, client_address = self.connection_queue.get_nowait()
-                client_socket.close()
-                log_debug(f"Очистка подключений из очереди: {client_address}")
-            except Empty:
-                break
-            except Exception as e:
-                log_error(f"Исключение при очистке очереди подключений: {e}", exc_info=True)
-        
         
         log_system_event(f'NTRIP сервер остановлен - всего подключений: {self.total_connections}, отклонено подключений: {self.rejected_connections}')
         log_system_event('NTRIP сервер закрыт')
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Тесты кэша результатов аутентификации (database.verify_mount_and_user):
+срок жизни записей и сброс после update_user_password / delete_user
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import config
+from src import database
+
+
+class AuthCacheTest(unittest.TestCase):
+    """Кэш аутентификации NTRIP 2.0 (имя пользователя и пароль)"""
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self._old_path = config.DATABASE_PATH
+        config.DATABASE_PATH = self.db_path
+        database.init_db()
+        self.db = database.DatabaseManager()
+        self.db.add_user('alice', 'pw1')
+        self.db.add_mount('M1', 'mpw')
+        database._invalidate_auth_cache()
+
+    def tearDown(self):
+        database._invalidate_auth_cache()
+        config.DATABASE_PATH = self._old_path
+        os.remove(self.db_path)
+
+    def _verify(self, password):
+        return database.verify_mount_and_user('M1', 'alice', password, protocol_version="2.0")[0]
+
+    def _set_password_directly(self, password):
+        """Изменить пароль в обход API, чтобы кэш не сбрасывался"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?",
+                         (database.hash_password(password), 'alice'))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def test_success_is_cached_until_ttl(self):
+        now = 1000.0
+        with mock.patch.object(database.time, 'monotonic', lambda: now):
+            self.assertTrue(self._verify('pw1'))
+            self._set_password_directly('other')
+            # Запись в кэше еще действительна
+            self.assertTrue(self._verify('pw1'))
+
+            now += database.AUTH_CACHE_TTL + 1
+            self.assertFalse(self._verify('pw1'))
+
+    def test_failure_uses_short_ttl(self):
+        now = 1000.0
+        with mock.patch.object(database.time, 'monotonic', lambda: now):
+            self.assertFalse(self._verify('wrong'))
+            self._set_password_directly('wrong')
+            self.assertFalse(self._verify('wrong'))
+
+            now += database.AUTH_FAILURE_CACHE_TTL + 1
+            self.assertTrue(self._verify('wrong'))
+
+    def test_update_user_password_invalidates(self):
+        self.assertTrue(self._verify('pw1'))
+        self.db.update_user_password('alice', 'pw2')
+        self.assertFalse(self._verify('pw1'))
+        self.assertTrue(self._verify('pw2'))
+
+    def test_delete_user_invalidates(self):
+        self.assertTrue(self._verify('pw1'))
+        self.db.delete_user('alice')
+        self.assertFalse(self._verify('pw1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тесты фильтра повторяющихся сообщений (logger.DedupFilter) и его сводных записей
+"""
+
+import os
+import sys
+import logging
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logger import DedupFilter
+
+
+def make_record(msg, created, args=None):
+    record = logging.LogRecord('ntrip', logging.INFO, __file__, 1, msg, args, None)
+    record.created = created
+    return record
+
+
+class DedupFilterTest(unittest.TestCase):
+
+    def test_repeats_inside_window_are_suppressed(self):
+        f = DedupFilter(window=1.0)
+        self.assertTrue(f.filter(make_record("msg", 100.0)))
+        self.assertFalse(f.filter(make_record("msg", 100.2)))
+        self.assertFalse(f.filter(make_record("msg", 100.4)))
+        # Вне окна сообщение снова пишется
+        self.assertTrue(f.filter(make_record("msg", 102.0)))
+
+    def test_summary_for_several_repeats(self):
+        f = DedupFilter(window=1.0)
+        f.filter(make_record("msg", 100.0))
+        f.filter(make_record("msg", 100.1))
+        f.filter(make_record("msg", 100.2))
+
+        summaries = f.collect()
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0].getMessage(), "Message repeated 2 times: msg")
+        # Сводная запись проходит через фильтр
+        self.assertTrue(f.filter(summaries[0]))
+        # Счетчики сброшены
+        self.assertEqual(f.collect(), [])
+
+    def test_single_repeat_is_reemitted_as_is(self):
+        f = DedupFilter(window=1.0)
+        f.filter(make_record("value %d", 100.0, (1,)))
+        f.filter(make_record("value %d", 100.1, (2,)))
+
+        summaries = f.collect()
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0].getMessage(), "value 2")
+        self.assertTrue(f.filter(summaries[0]))
+
+    def test_evicted_entry_keeps_its_summary(self):
+        f = DedupFilter(window=1.0, max_entries=1)
+        f.filter(make_record("first", 100.0))
+        f.filter(make_record("first", 100.1))
+        f.filter(make_record("first", 100.2))
+        f.filter(make_record("second", 100.3))
+
+        messages = [record.getMessage() for record in f.collect()]
+        self.assertEqual(messages, ["Message repeated 2 times: first"])
+
+
+if __name__ == '__main__':
+    unittest.main()
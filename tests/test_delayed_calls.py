@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Тесты планировщика отложенных вызовов (ntrip._DelayedCalls)
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ntrip
+
+
+class DelayedCallsTest(unittest.TestCase):
+
+    def _run(self, delays):
+        """Запланировать вызовы с задержками delays; вернуть порядок выполнения (индексы)"""
+        calls = ntrip._DelayedCalls()
+        order = []
+        done = threading.Event()
+
+        def make(index):
+            def func():
+                order.append(index)
+                if len(order) == len(delays):
+                    done.set()
+            return func
+
+        for index, delay in enumerate(delays):
+            calls.schedule(delay, make(index))
+        self.assertTrue(done.wait(5))
+        return order
+
+    def test_runs_in_deadline_order(self):
+        self.assertEqual(self._run([0.3, 0.1, 0.2]), [1, 2, 0])
+
+    def test_equal_deadlines_keep_schedule_order(self):
+        self.assertEqual(self._run([0.1, 0.1, 0.1, 0.0]), [3, 0, 1, 2])
+
+    def test_failing_call_does_not_stop_thread(self):
+        calls = ntrip._DelayedCalls()
+        done = threading.Event()
+
+        def fail():
+            raise RuntimeError("test")
+
+        calls.schedule(0.0, fail)
+        calls.schedule(0.05, done.set)
+        self.assertTrue(done.wait(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Тесты передачи подключений в пул потоков (NTRIPCaster._dispatch_connection):
+обработка рабочим потоком, учет слотов и отказ при заполненной очереди
+"""
+
+import os
+import sys
+import socket
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ntrip
+
+REQUEST = b"OPTIONS / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+class DispatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.caster = ntrip.NTRIPCaster(None)
+        self.caster.thread_pool = ThreadPoolExecutor(max_workers=1)
+        self.caster.queue_slots = threading.BoundedSemaphore(1)
+        self.sockets = []
+
+    def tearDown(self):
+        self.caster.thread_pool.shutdown(wait=True)
+        for sock in self.sockets:
+            sock.close()
+
+    def _dispatch(self):
+        """Принять подключение как главный цикл и передать его в пул; вернуть сокет клиента"""
+        server, client = socket.socketpair()
+        self.sockets += [server, client]
+        client.settimeout(5)
+        client.sendall(REQUEST)
+        self.assertTrue(self.caster._acquire_connection_slot())
+        self.caster._dispatch_connection(server, ('127.0.0.1', 0))
+        return client
+
+    def _wait_idle(self):
+        self.caster.thread_pool.submit(lambda: None).result(5)
+
+    def test_connection_is_served_by_worker(self):
+        client = self._dispatch()
+        self.assertTrue(client.recv(4096).startswith(b"HTTP/1.1 200 OK\r\n"))
+        self._wait_idle()
+
+        self.assertEqual(self.caster.total_connections, 1)
+        self.assertEqual(self.caster.queued_connections, 0)
+        self.assertEqual(self.caster.active_connections, 0)
+
+    def test_full_queue_rejects_connection(self):
+        release = threading.Event()
+        # Занять единственный рабочий поток, чтобы следующее подключение осталось в очереди
+        self.caster.thread_pool.submit(release.wait, 5)
+
+        queued = self._dispatch()
+        rejected = self._dispatch()
+        try:
+            data = rejected.recv(4096)
+        except ConnectionResetError:
+            # Сокет закрыт с непрочитанным запросом
+            data = b""
+        self.assertEqual(data, b"")
+        self.assertEqual(self.caster.rejected_connections, 1)
+        self.assertEqual(self.caster.queued_connections, 1)
+        self.assertEqual(self.caster.active_connections, 1)
+
+        release.set()
+        self.assertTrue(queued.recv(4096).startswith(b"HTTP/1.1 200 OK\r\n"))
+        self._wait_idle()
+        self.assertEqual(self.caster.queued_connections, 0)
+        self.assertEqual(self.caster.active_connections, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Тесты дочитывания заголовков запроса (NTRIPHandler._recv_header_rest):
+фрагментированные заголовки и запросы с голыми LF
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ntrip
+
+
+class HeaderReadTest(unittest.TestCase):
+    """Дочитывание заголовков после первого фрагмента"""
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.handler = ntrip.NTRIPHandler(self.server, ('127.0.0.1', 0), None)
+        self.buf = bytearray(ntrip.BUFFER_SIZE)
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def _read(self, first, *rest, delay=0.05):
+        """Отправить first сразу, остальные фрагменты - с задержкой; вернуть (байты, время ожидания)"""
+        self.client.sendall(first)
+
+        def send_rest():
+            for chunk in rest:
+                time.sleep(delay)
+                self.client.sendall(chunk)
+
+        sender = threading.Thread(target=send_rest)
+        sender.start()
+        received = self.server.recv_into(self.buf)
+        started = time.monotonic()
+        received = self.handler._recv_header_rest(self.buf, received)
+        elapsed = time.monotonic() - started
+        sender.join()
+        return bytes(self.buf[:received]), elapsed
+
+    def test_fragmented_crlf_headers(self):
+        data, elapsed = self._read(b"GET /M1 HTTP/1.1\r\nUser-", b"Agent: NTRIP test\r\n", b"\r\n")
+        self.assertEqual(data, b"GET /M1 HTTP/1.1\r\nUser-Agent: NTRIP test\r\n\r\n")
+        self.assertLess(elapsed, ntrip.REQUEST_HEADER_WAIT)
+
+    def test_terminator_split_across_fragments(self):
+        data, elapsed = self._read(b"GET /M1 HTTP/1.1\r\nHost: x\r\n\r", b"\n")
+        self.assertEqual(ntrip._find_header_end(data, 0, len(data)), len(data) - 4)
+        self.assertLess(elapsed, ntrip.REQUEST_HEADER_WAIT)
+
+    def test_lf_only_headers_do_not_wait(self):
+        data, elapsed = self._read(b"GET /M1 HTTP/1.0\nUser-Agent: NTRIP test\n", b"\n")
+        self.assertEqual(ntrip._find_header_end(data, 0, len(data)), len(data) - 2)
+        self.assertLess(elapsed, ntrip.REQUEST_HEADER_WAIT)
+
+    def test_missing_terminator_waits_at_most_header_wait(self):
+        data, elapsed = self._read(b"GET /M1 HTTP/1.1\r\n")
+        self.assertEqual(data, b"GET /M1 HTTP/1.1\r\n")
+        self.assertLess(elapsed, ntrip.REQUEST_HEADER_WAIT + 0.5)
+
+    def test_find_header_end_prefers_first_terminator(self):
+        self.assertEqual(ntrip._find_header_end(b"A\n\nB\r\n\r\n", 0, 9), 1)
+        self.assertEqual(ntrip._find_header_end(b"A\r\n\r\nB\n\n", 0, 9), 1)
+        self.assertEqual(ntrip._find_header_end(b"A\r\nB\r\n", 0, 6), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Тесты разбора строки запроса (NTRIPHandler._parse_request_line):
+метод возвращается в верхнем регистре независимо от регистра в запросе
+"""
+
+import os
+import sys
+import socket
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ntrip
+
+
+class RequestLineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.handler = ntrip.NTRIPHandler(self.server, ('127.0.0.1', 0), None)
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def _parse(self, line):
+        return self.handler._parse_request_line(line, line.split())
+
+    def test_lowercase_http_method_is_uppercased(self):
+        self.assertEqual(self._parse("get /M1 HTTP/1.1"), ('GET', '/M1', 'HTTP/1.1'))
+        self.assertEqual(self._parse("Options / HTTP/1.1"), ('OPTIONS', '/', 'HTTP/1.1'))
+
+    def test_lowercase_rtsp_method_is_uppercased(self):
+        self.assertEqual(self._parse("describe rtsp://host/M1 RTSP/1.0"),
+                         ('DESCRIBE', 'rtsp://host/M1', 'RTSP/1.0'))
+
+    def test_lowercase_source_request(self):
+        self.assertEqual(self._parse("source pw M1"), ('SOURCE', '/M1', 'NTRIP/1.0'))
+        self.assertEqual(self.handler.ntrip1_password, 'pw')
+
+    def test_lowercase_options_request_is_served(self):
+        self.client.sendall(b"options / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        self.handler.handle_request()
+        self.client.settimeout(2)
+        self.assertTrue(self.client.recv(4096).startswith(b"HTTP/1.1 200 OK\r\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()